@@ -1,19 +1,9 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import plotly.express as px
-import plotly.graph_objects as go
 
-# Import custom components
-from components.health_input import HealthInputComponent
-from components.dashboard import DashboardComponent
-from components.intervention_engine import InterventionEngine
-from components.progress_tracker import ProgressTracker
-from models.risk_models import RiskAssessmentModel
-from data.health_data import HealthDataManager
-from utils.alerts import AlertSystem
-from utils.visualization import VisualizationUtils
+# Page modules (plotly, scikit-learn, components) are imported inside the
+# handlers that use them, so a page only loads what it renders
+from utils.caching import cached_risk_scores, cached_risk_factors, cached_detailed_analysis, cached_interventions, cached_alerts
 
 # Page configuration
 st.set_page_config(
@@ -23,15 +13,46 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-# Initialize session state
-if 'health_data_manager' not in st.session_state:
-    st.session_state.health_data_manager = HealthDataManager()
-if 'risk_model' not in st.session_state:
-    st.session_state.risk_model = RiskAssessmentModel()
-if 'intervention_engine' not in st.session_state:
-    st.session_state.intervention_engine = InterventionEngine()
-if 'alert_system' not in st.session_state:
-    st.session_state.alert_system = AlertSystem()
+def project_risk_columns(data, risk_model):
+    """Select the risk model's feature columns present in a health data frame"""
+    # The free-text medication/condition columns are dropped before analysis
+    return data[data.columns.intersection(risk_model.feature_columns, sort=False)]
+
+# Shared resources (one instance per process, reused across sessions and reruns)
+@st.cache_resource
+def get_health_data_manager():
+    from data.health_data import HealthDataManager
+    return HealthDataManager()
+
+@st.cache_resource
+def get_risk_model():
+    from models.risk_models import RiskAssessmentModel
+    return RiskAssessmentModel()
+
+@st.cache_resource
+def get_data_processor():
+    from models.data_processor import DataProcessor
+    return DataProcessor()
+
+@st.cache_resource
+def get_intervention_engine():
+    from components.intervention_engine import InterventionEngine
+    return InterventionEngine()
+
+@st.cache_resource
+def get_alert_system():
+    from utils.alerts import AlertSystem
+    return AlertSystem()
+
+def get_scores(health_data_manager, risk_model, latest_data):
+    """Risk scores for the latest entry, computed once per data revision"""
+    key = ('scores', health_data_manager.revision)
+    cache = st.session_state.setdefault('_run_cache', {})
+    if key not in cache:
+        # Scores for older revisions are never read again
+        cache.clear()
+        cache[key] = cached_risk_scores(risk_model, latest_data)
+    return cache[key]
 
 def main():
     st.title("🏥 Chronic Disease Prevention Tracker")
@@ -44,37 +65,43 @@ def main():
         ["Dashboard", "Health Data Input", "Risk Assessment", "Interventions", "Progress Tracking", "Alerts"]
     )
     
-    # Initialize components
-    health_input = HealthInputComponent(st.session_state.health_data_manager)
-    dashboard = DashboardComponent(st.session_state.health_data_manager, st.session_state.risk_model)
-    progress_tracker = ProgressTracker(st.session_state.health_data_manager)
+    # Get shared resources
+    health_data_manager = get_health_data_manager()
     
     # Page routing
     if page == "Dashboard":
-        dashboard.render()
+        from components.dashboard import DashboardComponent
+        DashboardComponent(health_data_manager, get_risk_model(), get_data_processor()).render()
     elif page == "Health Data Input":
-        health_input.render()
+        from components.health_input import HealthInputComponent
+        HealthInputComponent(health_data_manager, get_data_processor()).render()
     elif page == "Risk Assessment":
-        render_risk_assessment()
+        render_risk_assessment(health_data_manager, get_risk_model())
     elif page == "Interventions":
-        render_interventions()
+        render_interventions(health_data_manager, get_risk_model(), get_intervention_engine())
     elif page == "Progress Tracking":
-        progress_tracker.render()
+        from components.progress_tracker import ProgressTracker
+        ProgressTracker(health_data_manager, get_data_processor()).render()
     elif page == "Alerts":
-        render_alerts()
+        render_alerts(health_data_manager, get_alert_system())
 
-def render_risk_assessment():
+def render_risk_assessment(health_data_manager, risk_model):
+    import plotly.express as px
+    from utils.visualization import risk_label
+    
     st.header("🔍 Risk Assessment")
     
     # Get latest health data
-    latest_data = st.session_state.health_data_manager.get_latest_data()
+    latest_data = health_data_manager.get_latest_data()
     
     if latest_data.empty:
         st.warning("No health data available. Please input your health metrics first.")
         return
     
+    latest_data = project_risk_columns(latest_data, risk_model)
+    
     # Calculate risk scores
-    risk_scores = st.session_state.risk_model.calculate_risk_scores(latest_data)
+    risk_scores = get_scores(health_data_manager, risk_model, latest_data)
     
     # Display risk assessment
     col1, col2, col3 = st.columns(3)
@@ -86,7 +113,7 @@ def render_risk_assessment():
             delta=None,
             help="Risk of developing pre-diabetes based on current metrics"
         )
-        risk_level = "High" if risk_scores['pre_diabetes'] > 0.7 else "Medium" if risk_scores['pre_diabetes'] > 0.4 else "Low"
+        risk_level, _ = risk_label(risk_scores['pre_diabetes'])
         st.write(f"Risk Level: **{risk_level}**")
     
     with col2:
@@ -96,7 +123,7 @@ def render_risk_assessment():
             delta=None,
             help="Risk of developing hypertension based on current metrics"
         )
-        risk_level = "High" if risk_scores['hypertension'] > 0.7 else "Medium" if risk_scores['hypertension'] > 0.4 else "Low"
+        risk_level, _ = risk_label(risk_scores['hypertension'])
         st.write(f"Risk Level: **{risk_level}**")
     
     with col3:
@@ -106,13 +133,13 @@ def render_risk_assessment():
             delta=None,
             help="Risk of developing metabolic syndrome based on current metrics"
         )
-        risk_level = "High" if risk_scores['metabolic_syndrome'] > 0.7 else "Medium" if risk_scores['metabolic_syndrome'] > 0.4 else "Low"
+        risk_level, _ = risk_label(risk_scores['metabolic_syndrome'])
         st.write(f"Risk Level: **{risk_level}**")
     
     # Risk factors analysis
     st.subheader("📊 Risk Factors Analysis")
     
-    risk_factors = st.session_state.risk_model.analyze_risk_factors(latest_data)
+    risk_factors = cached_risk_factors(risk_model, latest_data)
     
     # Create risk factors visualization
     if risk_factors:
@@ -122,30 +149,33 @@ def render_risk_assessment():
             title="Risk Factors Contribution",
             labels={'x': 'Risk Factors', 'y': 'Contribution Score'}
         )
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, config={'staticPlot': True, 'displayModeBar': False}, key='chart_risk_factors')
     
     # Detailed risk analysis
     st.subheader("📋 Detailed Risk Analysis")
     
     for condition, score in risk_scores.items():
         with st.expander(f"{condition.replace('_', ' ').title()} - {score:.1%} Risk"):
-            analysis = st.session_state.risk_model.get_detailed_analysis(condition, latest_data)
+            analysis = cached_detailed_analysis(risk_model, condition, latest_data)
             st.write(analysis)
 
-def render_interventions():
+# Rendered as a fragment so tracking an intervention reruns only this page
+@st.fragment
+def render_interventions(health_data_manager, risk_model, intervention_engine):
     st.header("💊 Intervention Recommendations")
     
     # Get latest health data and risk scores
-    latest_data = st.session_state.health_data_manager.get_latest_data()
+    latest_data = health_data_manager.get_latest_data()
     
     if latest_data.empty:
         st.warning("No health data available. Please input your health metrics first.")
         return
     
-    risk_scores = st.session_state.risk_model.calculate_risk_scores(latest_data)
+    latest_data = project_risk_columns(latest_data, risk_model)
+    risk_scores = get_scores(health_data_manager, risk_model, latest_data)
     
     # Get personalized interventions
-    interventions = st.session_state.intervention_engine.get_interventions(latest_data, risk_scores)
+    interventions = cached_interventions(intervention_engine, latest_data.iloc[-1].to_dict(), risk_scores)
     
     # Display interventions by category
     for category, intervention_list in interventions.items():
@@ -164,31 +194,36 @@ def render_interventions():
                 
                 # Add tracking button
                 if st.button(f"Start Tracking: {intervention['title']}", key=f"track_{intervention['title']}"):
-                    st.session_state.health_data_manager.add_intervention_tracking(intervention)
+                    health_data_manager.add_intervention_tracking(intervention)
                     st.success(f"Started tracking: {intervention['title']}")
-                    st.rerun()
+                    st.rerun(scope="fragment")
 
-def render_alerts():
+def render_alerts(health_data_manager, alert_system):
     st.header("🚨 Health Alerts")
     
     # Get all health data
-    all_data = st.session_state.health_data_manager.get_all_data()
+    all_data = health_data_manager.get_all_data()
     
     if all_data.empty:
         st.info("No health data available for alert analysis.")
         return
     
     # Generate alerts
-    alerts = st.session_state.alert_system.check_alerts(all_data)
+    alerts = cached_alerts(alert_system, health_data_manager.revision, all_data)
     
     if not alerts:
         st.success("🎉 No concerning health alerts at this time!")
         return
     
+    # Group alerts by severity in a single pass
+    buckets = {'Critical': [], 'Warning': [], 'Info': []}
+    for alert in alerts:
+        buckets[alert['severity']].append(alert)
+    critical_alerts = buckets['Critical']
+    warning_alerts = buckets['Warning']
+    info_alerts = buckets['Info']
+    
     # Display alerts by severity
-    critical_alerts = [a for a in alerts if a['severity'] == 'Critical']
-    warning_alerts = [a for a in alerts if a['severity'] == 'Warning']
-    info_alerts = [a for a in alerts if a['severity'] == 'Info']
     
     if critical_alerts:
         st.error("Critical Alerts")
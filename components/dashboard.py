@@ -1,17 +1,34 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from datetime import datetime, timedelta
-from models.data_processor import DataProcessor
-from utils.visualization import VisualizationUtils
+from utils.visualization import VisualizationUtils, risk_label, plotly_dates, _scatter_cls, CHART_MAX_POINTS
+from utils.caching import cached_risk_scores, cached_risk_factors, cached_health_score, cached_trends, cached_health_insights, cached_risk_factors_radar, cached_biomarker_gauges
+
+# Status lookup tables for the overview metrics (a value equal to a threshold
+# falls into the next label)
+BMI_THRESH = np.array([18.5, 25, 30])
+BMI_LABELS = ("Underweight", "Normal", "Overweight", "Obese")
+GLUCOSE_THRESH = np.array([100, 126])
+GLUCOSE_LABELS = ("Normal", "Pre-diabetic", "Diabetic")
+CHOL_THRESH = np.array([200, 240])
+CHOL_LABELS = ("Normal", "Borderline", "High")
+BP_LABELS = ("Normal", "Elevated", "High")
+MISSING_STATUS = "N/A"
+
+def _status(thresholds, labels, value):
+    """Status label for a reading, N/A when it is missing"""
+    if pd.isna(value):
+        return MISSING_STATUS
+    return labels[np.searchsorted(thresholds, value, side='right')]
 
 class DashboardComponent:
-    def __init__(self, health_data_manager, risk_model):
+    def __init__(self, health_data_manager, risk_model, data_processor):
         self.health_data_manager = health_data_manager
         self.risk_model = risk_model
-        self.data_processor = DataProcessor()
+        self.data_processor = data_processor
         self.viz_utils = VisualizationUtils()
     
     def render(self):
@@ -25,13 +42,22 @@ class DashboardComponent:
             return
         
         # Calculate health score
-        health_score = self.data_processor.calculate_health_score(all_data)
+        health_score = cached_health_score(self.data_processor, all_data)
+        
+        # Get latest data for current metrics as a plain dict, reusing the
+        # snapshot from previous reruns until the data revision changes
+        snapshot_key = self.health_data_manager.revision
+        snapshot = st.session_state.get('latest_snapshot')
+        if snapshot is None or snapshot[0] != snapshot_key:
+            snapshot = (snapshot_key, all_data.iloc[-1].to_dict())
+            st.session_state['latest_snapshot'] = snapshot
+        latest = snapshot[1]
         
-        # Get latest data for current metrics
-        latest_data = all_data.iloc[-1]
+        # Each section below is an st.fragment: interacting with one section
+        # reruns only that section, not the whole dashboard
         
         # Display overview metrics
-        self._display_overview_metrics(health_score, latest_data)
+        self._display_overview_metrics(health_score, latest)
         
         # Display risk assessment summary
         self._display_risk_summary(all_data)
@@ -43,9 +69,10 @@ class DashboardComponent:
         self._display_health_insights(all_data)
         
         # Display biomarker tracking
-        self._display_biomarker_tracking(all_data)
+        self._display_biomarker_tracking(latest)
     
-    def _display_overview_metrics(self, health_score, latest_data):
+    @st.fragment
+    def _display_overview_metrics(self, health_score, latest):
         """Display overview health metrics"""
         st.subheader("🎯 Health Overview")
         
@@ -70,56 +97,61 @@ class DashboardComponent:
             )
         
         with col2:
-            bmi = latest_data.get('bmi', 0)
-            bmi_status = "Normal" if 18.5 <= bmi < 25 else "Overweight" if 25 <= bmi < 30 else "Obese" if bmi >= 30 else "Underweight"
+            bmi = latest.get('bmi', 0)
+            bmi_status = _status(BMI_THRESH, BMI_LABELS, bmi)
             st.metric("BMI", f"{bmi:.1f}", f"{bmi_status}")
         
         with col3:
-            systolic = latest_data.get('systolic_bp', 0)
-            diastolic = latest_data.get('diastolic_bp', 0)
-            bp_status = "Normal" if systolic < 120 and diastolic < 80 else "Elevated" if systolic < 130 else "High"
+            systolic = latest.get('systolic_bp', 0)
+            diastolic = latest.get('diastolic_bp', 0)
+            if pd.isna(systolic) or pd.isna(diastolic):
+                bp_status = MISSING_STATUS
+            else:
+                bp_status = BP_LABELS[int(np.select([(systolic < 120) & (diastolic < 80), systolic < 130], [0, 1], 2))]
             st.metric("Blood Pressure", f"{systolic}/{diastolic}", f"{bp_status}")
         
         with col4:
-            glucose = latest_data.get('glucose_fasting', 0)
-            glucose_status = "Normal" if glucose < 100 else "Pre-diabetic" if glucose < 126 else "Diabetic"
+            glucose = latest.get('glucose_fasting', 0)
+            glucose_status = _status(GLUCOSE_THRESH, GLUCOSE_LABELS, glucose)
             st.metric("Fasting Glucose", f"{glucose} mg/dL", f"{glucose_status}")
         
         with col5:
-            cholesterol = latest_data.get('total_cholesterol', 0)
-            chol_status = "Normal" if cholesterol < 200 else "Borderline" if cholesterol < 240 else "High"
+            cholesterol = latest.get('total_cholesterol', 0)
+            chol_status = _status(CHOL_THRESH, CHOL_LABELS, cholesterol)
             st.metric("Total Cholesterol", f"{cholesterol} mg/dL", f"{chol_status}")
     
+    @st.fragment
     def _display_risk_summary(self, all_data):
         """Display risk assessment summary"""
         st.subheader("⚠️ Risk Assessment Summary")
         
+        # Only the model's input columns are needed for scoring
+        risk_data = all_data[all_data.columns.intersection(self.risk_model.feature_columns, sort=False)]
+        
         # Calculate risk scores
-        risk_scores = self.risk_model.calculate_risk_scores(all_data)
+        risk_scores = cached_risk_scores(self.risk_model, risk_data)
         
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            risk_level = "High" if risk_scores['pre_diabetes'] > 0.7 else "Medium" if risk_scores['pre_diabetes'] > 0.4 else "Low"
-            color = "🔴" if risk_level == "High" else "🟡" if risk_level == "Medium" else "🟢"
+            risk_level, color = risk_label(risk_scores['pre_diabetes'])
             st.metric("Pre-Diabetes Risk", f"{color} {risk_scores['pre_diabetes']:.1%}", f"{risk_level} Risk")
         
         with col2:
-            risk_level = "High" if risk_scores['hypertension'] > 0.7 else "Medium" if risk_scores['hypertension'] > 0.4 else "Low"
-            color = "🔴" if risk_level == "High" else "🟡" if risk_level == "Medium" else "🟢"
+            risk_level, color = risk_label(risk_scores['hypertension'])
             st.metric("Hypertension Risk", f"{color} {risk_scores['hypertension']:.1%}", f"{risk_level} Risk")
         
         with col3:
-            risk_level = "High" if risk_scores['metabolic_syndrome'] > 0.7 else "Medium" if risk_scores['metabolic_syndrome'] > 0.4 else "Low"
-            color = "🔴" if risk_level == "High" else "🟡" if risk_level == "Medium" else "🟢"
+            risk_level, color = risk_label(risk_scores['metabolic_syndrome'])
             st.metric("Metabolic Syndrome Risk", f"{color} {risk_scores['metabolic_syndrome']:.1%}", f"{risk_level} Risk")
         
         # Risk factors radar chart
-        risk_factors = self.risk_model.analyze_risk_factors(all_data)
+        risk_factors = cached_risk_factors(self.risk_model, risk_data)
         if risk_factors:
-            fig = self.viz_utils.create_risk_factors_radar(risk_factors)
-            st.plotly_chart(fig, use_container_width=True)
+            fig = cached_risk_factors_radar(self.viz_utils, risk_factors)
+            st.plotly_chart(fig, use_container_width=True, config={'staticPlot': True, 'displayModeBar': False}, key='chart_risk_radar')
     
+    @st.fragment
     def _display_trends(self, all_data):
         """Display health trends over time"""
         st.subheader("📈 Health Trends")
@@ -129,7 +161,7 @@ class DashboardComponent:
             return
         
         # Create trend analysis
-        trends = self.data_processor.detect_trends(all_data)
+        trends = cached_trends(self.data_processor, self.health_data_manager.revision, all_data)
         
         # Display trend summary
         if trends:
@@ -159,14 +191,20 @@ class DashboardComponent:
                        [{"secondary_y": False}, {"secondary_y": False}]]
             )
             
+            dates = plotly_dates(all_data['date'])
+            scatter_cls = _scatter_cls(len(dates))
+            
             for i, metric in enumerate(available_metrics[:4]):
                 row = (i // 2) + 1
                 col = (i % 2) + 1
                 
+                # Only send visually significant points for long histories
+                x, y = self.viz_utils.downsample_lttb(dates, all_data[metric], CHART_MAX_POINTS)
+                
                 fig.add_trace(
-                    go.Scatter(
-                        x=all_data['date'],
-                        y=all_data[metric],
+                    scatter_cls(
+                        x=x,
+                        y=y,
                         mode='lines+markers',
                         name=metric.replace('_', ' ').title(),
                         line=dict(width=2)
@@ -177,16 +215,19 @@ class DashboardComponent:
             fig.update_layout(
                 title="Health Metrics Over Time",
                 height=500,
-                showlegend=False
+                showlegend=False,
+                uirevision='dashboard::trends'  # keep pan/zoom state across reruns
             )
+            fig.update_xaxes(type='date')
             
-            st.plotly_chart(fig, use_container_width=True)
+            st.plotly_chart(fig, use_container_width=True, key='chart_trends')
     
+    @st.fragment
     def _display_health_insights(self, all_data):
         """Display health insights"""
         st.subheader("💡 Health Insights")
         
-        insights = self.data_processor.get_health_insights(all_data)
+        insights = cached_health_insights(self.data_processor, all_data)
         
         if not insights:
             st.success("🎉 No concerning health insights at this time! Keep up the good work!")
@@ -203,27 +244,23 @@ class DashboardComponent:
                 st.success(f"✅ {insight['message']}")
                 st.write(f"**Recommendation:** {insight['recommendation']}")
     
-    def _display_biomarker_tracking(self, all_data):
+    @st.fragment
+    def _display_biomarker_tracking(self, latest):
         """Display biomarker tracking"""
         st.subheader("🧬 Biomarker Tracking")
         
         # Create biomarker comparison chart
-        latest_data = all_data.iloc[-1]
-        
         biomarkers = {
-            'BMI': {'value': latest_data.get('bmi', 0), 'normal_range': (18.5, 24.9), 'unit': ''},
-            'Systolic BP': {'value': latest_data.get('systolic_bp', 0), 'normal_range': (90, 120), 'unit': 'mmHg'},
-            'Diastolic BP': {'value': latest_data.get('diastolic_bp', 0), 'normal_range': (60, 80), 'unit': 'mmHg'},
-            'Fasting Glucose': {'value': latest_data.get('glucose_fasting', 0), 'normal_range': (70, 100), 'unit': 'mg/dL'},
-            'Total Cholesterol': {'value': latest_data.get('total_cholesterol', 0), 'normal_range': (150, 200), 'unit': 'mg/dL'},
-            'HDL Cholesterol': {'value': latest_data.get('hdl_cholesterol', 0), 'normal_range': (40, 100), 'unit': 'mg/dL'},
-            'Triglycerides': {'value': latest_data.get('triglycerides', 0), 'normal_range': (50, 150), 'unit': 'mg/dL'}
+            'BMI': {'value': latest.get('bmi', 0), 'normal_range': (18.5, 24.9), 'unit': ''},
+            'Systolic BP': {'value': latest.get('systolic_bp', 0), 'normal_range': (90, 120), 'unit': 'mmHg'},
+            'Diastolic BP': {'value': latest.get('diastolic_bp', 0), 'normal_range': (60, 80), 'unit': 'mmHg'},
+            'Fasting Glucose': {'value': latest.get('glucose_fasting', 0), 'normal_range': (70, 100), 'unit': 'mg/dL'},
+            'Total Cholesterol': {'value': latest.get('total_cholesterol', 0), 'normal_range': (150, 200), 'unit': 'mg/dL'},
+            'HDL Cholesterol': {'value': latest.get('hdl_cholesterol', 0), 'normal_range': (40, 100), 'unit': 'mg/dL'},
+            'Triglycerides': {'value': latest.get('triglycerides', 0), 'normal_range': (50, 150), 'unit': 'mg/dL'}
         }
         
-        # Create gauge charts
-        cols = st.columns(2)
-        
-        for i, (biomarker, data) in enumerate(biomarkers.items()):
-            with cols[i % 2]:
-                fig = self.viz_utils.create_biomarker_gauge(biomarker, data)
-                st.plotly_chart(fig, use_container_width=True)
+        # Create gauge charts as a single figure (one Plotly mount instead of one per biomarker),
+        # rendered static since the gauges are display-only
+        fig = cached_biomarker_gauges(self.viz_utils, biomarkers)
+        st.plotly_chart(fig, use_container_width=True, theme=None, config={'staticPlot': True, 'displayModeBar': False}, key='chart_biomarkers')
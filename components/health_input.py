@@ -1,12 +1,77 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
 from datetime import datetime, date
-from models.data_processor import DataProcessor
+
+# Immediate feedback lookup tables: (streamlit message function, message template)
+BMI_FEEDBACK = (
+    (st.warning, "Your BMI ({value:.1f}) is below normal range. Consider consulting a healthcare provider."),
+    (st.success, "Your BMI ({value:.1f}) is in the healthy range."),
+    (st.info, "Your BMI ({value:.1f}) indicates overweight status. Consider healthy lifestyle changes."),
+    (st.warning, "Your BMI ({value:.1f}) indicates obesity. Consider lifestyle modifications.")
+)
+BP_FEEDBACK = (
+    (st.success, "Your blood pressure ({systolic}/{diastolic}) is normal."),
+    (st.warning, "Your blood pressure ({systolic}/{diastolic}) is elevated. Monitor closely."),
+    (st.error, "Your blood pressure ({systolic}/{diastolic}) is in hypertensive range. Consult a healthcare provider.")
+)
+# Glucose levels are strictly above each threshold
+GLUCOSE_THRESH = np.array([100, 126])
+GLUCOSE_FEEDBACK = (
+    (st.success, "Your fasting glucose ({value} mg/dL) is normal."),
+    (st.warning, "Your fasting glucose ({value} mg/dL) is in pre-diabetic range. Consider lifestyle modifications."),
+    (st.error, "Your fasting glucose ({value} mg/dL) is in diabetic range. Consult a healthcare provider immediately.")
+)
+
+# Stored codes for the lifestyle selectboxes (the keys are the options shown)
+SMOKING_MAP = {"Non-smoker": 0, "Former smoker": 0, "Current smoker": 1}
+ALCOHOL_MAP = {"None": 0, "Light (1-2 drinks/week)": 1, "Moderate (3-7 drinks/week)": 2, "Heavy (>7 drinks/week)": 3}
+DIET_MAP = {"Poor": 1, "Fair": 2, "Good": 3, "Excellent": 4}
+
+# Vital signs, cholesterol panel and lifestyle numbers are edited as one table row
+VITALS_DEFAULTS = {
+    'systolic_bp': 120, 'diastolic_bp': 80, 'resting_heart_rate': 70,
+    'glucose_fasting': 90, 'hba1c': 5.0,
+    'total_cholesterol': 200, 'hdl_cholesterol': 50, 'ldl_cholesterol': 100, 'triglycerides': 150,
+    'exercise_minutes_per_week': 150, 'sleep_hours': 7
+}
+VITALS_TEMPLATE = pd.DataFrame([VITALS_DEFAULTS])
+VITALS_COLUMN_CONFIG = {
+    'systolic_bp': st.column_config.NumberColumn("Systolic BP (mmHg)", min_value=70, max_value=250, step=1, required=True),
+    'diastolic_bp': st.column_config.NumberColumn("Diastolic BP (mmHg)", min_value=40, max_value=150, step=1, required=True),
+    'resting_heart_rate': st.column_config.NumberColumn("Resting Heart Rate (bpm)", min_value=40, max_value=200, step=1, required=True),
+    'glucose_fasting': st.column_config.NumberColumn("Fasting Glucose (mg/dL)", min_value=50, max_value=400, step=1, required=True),
+    'hba1c': st.column_config.NumberColumn("HbA1c (%)", min_value=3.0, max_value=15.0, step=0.1, format="%.1f", required=True),
+    'total_cholesterol': st.column_config.NumberColumn("Total Cholesterol (mg/dL)", min_value=100, max_value=500, step=1, required=True),
+    'hdl_cholesterol': st.column_config.NumberColumn("HDL Cholesterol (mg/dL)", min_value=20, max_value=100, step=1, required=True),
+    'ldl_cholesterol': st.column_config.NumberColumn("LDL Cholesterol (mg/dL)", min_value=50, max_value=300, step=1, required=True),
+    'triglycerides': st.column_config.NumberColumn("Triglycerides (mg/dL)", min_value=50, max_value=1000, step=1, required=True),
+    'exercise_minutes_per_week': st.column_config.NumberColumn("Exercise Minutes per Week", min_value=0, max_value=1000, step=1, required=True),
+    'sleep_hours': st.column_config.NumberColumn("Average Sleep Hours per Night", min_value=1, max_value=12, step=1, required=True)
+}
+
+RECENT_ENTRIES_HEADER = (
+    "| Date | BMI | Age | Blood Pressure | Heart Rate | Fasting Glucose | HbA1c | Total Cholesterol | HDL |\n"
+    "|---|---|---|---|---|---|---|---|---|\n"
+)
+
+@st.cache_data(show_spinner=False)
+def _render_recent_markdown(revision, limit, _data):
+    """Markdown table of recent entries, rebuilt only when the data revision changes"""
+    lines = [RECENT_ENTRIES_HEADER]
+    for row in _data.itertuples(index=False):
+        lines.append(
+            f"| {row.date.strftime('%Y-%m-%d')} | {row.bmi:.1f} | {row.age} "
+            f"| {row.systolic_bp}/{row.diastolic_bp} | {getattr(row, 'resting_heart_rate', 'N/A')} "
+            f"| {row.glucose_fasting} mg/dL | {getattr(row, 'hba1c', 'N/A')}% "
+            f"| {row.total_cholesterol} mg/dL | {row.hdl_cholesterol} mg/dL |\n"
+        )
+    return "".join(lines)
 
 class HealthInputComponent:
-    def __init__(self, health_data_manager):
+    def __init__(self, health_data_manager, data_processor):
         self.health_data_manager = health_data_manager
-        self.data_processor = DataProcessor()
+        self.data_processor = data_processor
     
     def render(self):
         st.header("📊 Health Data Input")
@@ -27,49 +92,30 @@ class HealthInputComponent:
             with col2:
                 gender = st.selectbox("Gender", ["Male", "Female", "Other"])
                 measurement_date = st.date_input("Measurement Date", value=date.today())
-                
-                # Calculate BMI
-                bmi = weight / ((height/100) ** 2)
-                st.metric("Calculated BMI", f"{bmi:.1f}")
-            
-            st.subheader("Vital Signs")
-            
-            col1, col2 = st.columns(2)
-            
-            with col1:
-                systolic_bp = st.number_input("Systolic Blood Pressure (mmHg)", min_value=70, max_value=250, value=120)
-                diastolic_bp = st.number_input("Diastolic Blood Pressure (mmHg)", min_value=40, max_value=150, value=80)
-                resting_heart_rate = st.number_input("Resting Heart Rate (bpm)", min_value=40, max_value=200, value=70)
-            
-            with col2:
-                glucose_fasting = st.number_input("Fasting Glucose (mg/dL)", min_value=50, max_value=400, value=90)
-                hba1c = st.number_input("HbA1c (%)", min_value=3.0, max_value=15.0, value=5.0, step=0.1)
-            
-            st.subheader("Cholesterol Panel")
             
-            col1, col2 = st.columns(2)
+            st.subheader("Vital Signs, Cholesterol Panel and Activity")
             
-            with col1:
-                total_cholesterol = st.number_input("Total Cholesterol (mg/dL)", min_value=100, max_value=500, value=200)
-                hdl_cholesterol = st.number_input("HDL Cholesterol (mg/dL)", min_value=20, max_value=100, value=50)
-            
-            with col2:
-                ldl_cholesterol = st.number_input("LDL Cholesterol (mg/dL)", min_value=50, max_value=300, value=100)
-                triglycerides = st.number_input("Triglycerides (mg/dL)", min_value=50, max_value=1000, value=150)
+            # One compound editor instead of a number input per metric
+            vitals = st.data_editor(
+                VITALS_TEMPLATE,
+                column_config=VITALS_COLUMN_CONFIG,
+                num_rows="fixed",
+                hide_index=True,
+                use_container_width=True,
+                key="vitals_editor"
+            )
             
             st.subheader("Lifestyle Factors")
             
             col1, col2 = st.columns(2)
             
             with col1:
-                exercise_minutes_per_week = st.number_input("Exercise Minutes per Week", min_value=0, max_value=1000, value=150)
-                sleep_hours = st.number_input("Average Sleep Hours per Night", min_value=1, max_value=12, value=7)
                 stress_level = st.slider("Stress Level (1-10)", min_value=1, max_value=10, value=5)
             
             with col2:
-                smoking_status = st.selectbox("Smoking Status", ["Non-smoker", "Former smoker", "Current smoker"])
-                alcohol_consumption = st.selectbox("Alcohol Consumption", ["None", "Light (1-2 drinks/week)", "Moderate (3-7 drinks/week)", "Heavy (>7 drinks/week)"])
-                diet_quality = st.selectbox("Diet Quality", ["Poor", "Fair", "Good", "Excellent"])
+                smoking_status = st.selectbox("Smoking Status", list(SMOKING_MAP))
+                alcohol_consumption = st.selectbox("Alcohol Consumption", list(ALCOHOL_MAP))
+                diet_quality = st.selectbox("Diet Quality", list(DIET_MAP))
             
             st.subheader("Additional Metrics")
             
@@ -88,6 +134,16 @@ class HealthInputComponent:
             submitted = st.form_submit_button("Save Health Data", type="primary")
             
             if submitted:
+                # BMI is derived from the submitted values (form widgets only
+                # commit on submit, so an in-form preview would be stale)
+                bmi = weight / ((height/100) ** 2)
+                
+                # Cleared cells fall back to their defaults
+                metrics = vitals.fillna(VITALS_DEFAULTS).astype(VITALS_TEMPLATE.dtypes).to_dict('records')[0]
+                systolic_bp = metrics['systolic_bp']
+                diastolic_bp = metrics['diastolic_bp']
+                glucose_fasting = metrics['glucose_fasting']
+                
                 # Prepare data dictionary
                 health_data = {
                     'date': measurement_date,
@@ -99,19 +155,19 @@ class HealthInputComponent:
                     'gender': gender,
                     'systolic_bp': systolic_bp,
                     'diastolic_bp': diastolic_bp,
-                    'resting_heart_rate': resting_heart_rate,
+                    'resting_heart_rate': metrics['resting_heart_rate'],
                     'glucose_fasting': glucose_fasting,
-                    'hba1c': hba1c,
-                    'total_cholesterol': total_cholesterol,
-                    'hdl_cholesterol': hdl_cholesterol,
-                    'ldl_cholesterol': ldl_cholesterol,
-                    'triglycerides': triglycerides,
-                    'exercise_minutes_per_week': exercise_minutes_per_week,
-                    'sleep_hours': sleep_hours,
+                    'hba1c': metrics['hba1c'],
+                    'total_cholesterol': metrics['total_cholesterol'],
+                    'hdl_cholesterol': metrics['hdl_cholesterol'],
+                    'ldl_cholesterol': metrics['ldl_cholesterol'],
+                    'triglycerides': metrics['triglycerides'],
+                    'exercise_minutes_per_week': metrics['exercise_minutes_per_week'],
+                    'sleep_hours': metrics['sleep_hours'],
                     'stress_level': stress_level,
-                    'smoking_status': 1 if smoking_status == "Current smoker" else 0,
-                    'alcohol_consumption': {"None": 0, "Light (1-2 drinks/week)": 1, "Moderate (3-7 drinks/week)": 2, "Heavy (>7 drinks/week)": 3}[alcohol_consumption],
-                    'diet_quality': {"Poor": 1, "Fair": 2, "Good": 3, "Excellent": 4}[diet_quality],
+                    'smoking_status': SMOKING_MAP[smoking_status],
+                    'alcohol_consumption': ALCOHOL_MAP[alcohol_consumption],
+                    'diet_quality': DIET_MAP[diet_quality],
                     'family_history_diabetes': family_history_diabetes,
                     'family_history_heart_disease': family_history_heart_disease,
                     'family_history_hypertension': family_history_hypertension,
@@ -159,63 +215,34 @@ class HealthInputComponent:
         """Provide immediate feedback on entered data"""
         st.subheader("Immediate Health Insights")
         
-        # BMI feedback
+        # BMI feedback (below 18.5 is underweight, above 25/30 overweight/obese)
         bmi = health_data['bmi']
-        if bmi < 18.5:
-            st.warning(f"Your BMI ({bmi:.1f}) is below normal range. Consider consulting a healthcare provider.")
-        elif bmi > 30:
-            st.warning(f"Your BMI ({bmi:.1f}) indicates obesity. Consider lifestyle modifications.")
-        elif bmi > 25:
-            st.info(f"Your BMI ({bmi:.1f}) indicates overweight status. Consider healthy lifestyle changes.")
-        else:
-            st.success(f"Your BMI ({bmi:.1f}) is in the healthy range.")
+        level = int(np.select([bmi < 18.5, bmi > 30, bmi > 25], [0, 3, 2], 1))
+        message_fn, template = BMI_FEEDBACK[level]
+        message_fn(template.format(value=bmi))
         
         # Blood pressure feedback
         systolic = health_data['systolic_bp']
         diastolic = health_data['diastolic_bp']
-        if systolic > 140 or diastolic > 90:
-            st.error(f"Your blood pressure ({systolic}/{diastolic}) is in hypertensive range. Consult a healthcare provider.")
-        elif systolic > 130 or diastolic > 80:
-            st.warning(f"Your blood pressure ({systolic}/{diastolic}) is elevated. Monitor closely.")
-        else:
-            st.success(f"Your blood pressure ({systolic}/{diastolic}) is normal.")
+        level = int(np.select([(systolic > 140) | (diastolic > 90), (systolic > 130) | (diastolic > 80)], [2, 1], 0))
+        message_fn, template = BP_FEEDBACK[level]
+        message_fn(template.format(systolic=systolic, diastolic=diastolic))
         
         # Glucose feedback
         glucose = health_data['glucose_fasting']
-        if glucose > 126:
-            st.error(f"Your fasting glucose ({glucose} mg/dL) is in diabetic range. Consult a healthcare provider immediately.")
-        elif glucose > 100:
-            st.warning(f"Your fasting glucose ({glucose} mg/dL) is in pre-diabetic range. Consider lifestyle modifications.")
-        else:
-            st.success(f"Your fasting glucose ({glucose} mg/dL) is normal.")
+        message_fn, template = GLUCOSE_FEEDBACK[np.searchsorted(GLUCOSE_THRESH, glucose, side='left')]
+        message_fn(template.format(value=glucose))
     
     def _display_recent_entries(self):
         """Display recent health data entries"""
         st.subheader("Recent Health Data Entries")
         
-        data = self.health_data_manager.get_recent_data(limit=5)
+        limit = 5
+        data = self.health_data_manager.get_recent_data(limit=limit)
         
         if data.empty:
             st.info("No health data entries yet. Add your first entry above!")
             return
         
-        # Display in a nice format
-        for idx, row in data.iterrows():
-            with st.expander(f"Entry from {row['date'].strftime('%Y-%m-%d')}", expanded=False):
-                col1, col2, col3, col4 = st.columns(4)
-                
-                with col1:
-                    st.metric("BMI", f"{row['bmi']:.1f}")
-                    st.metric("Age", f"{row['age']}")
-                
-                with col2:
-                    st.metric("Blood Pressure", f"{row['systolic_bp']}/{row['diastolic_bp']}")
-                    st.metric("Heart Rate", f"{row.get('resting_heart_rate', 'N/A')}")
-                
-                with col3:
-                    st.metric("Fasting Glucose", f"{row['glucose_fasting']} mg/dL")
-                    st.metric("HbA1c", f"{row.get('hba1c', 'N/A')}%")
-                
-                with col4:
-                    st.metric("Total Cholesterol", f"{row['total_cholesterol']} mg/dL")
-                    st.metric("HDL", f"{row['hdl_cholesterol']} mg/dL")
+        # Display as a single table instead of one expander of metrics per entry
+        st.markdown(_render_recent_markdown(self.health_data_manager.revision, limit, data))
@@ -1,353 +1,508 @@
 import pandas as pd
+import numpy as np
+from collections import ChainMap
+from itertools import chain
+import operator
 from datetime import datetime, timedelta
+from types import MappingProxyType
 
-class InterventionEngine:
-    def __init__(self):
-        self.intervention_library = self._build_intervention_library()
-    
-    def _build_intervention_library(self):
-        """Build comprehensive intervention library"""
-        return {
-            'dietary_interventions': [
-                {
-                    'title': 'Mediterranean Diet Adoption',
-                    'priority': 'High',
-                    'evidence_level': 'Strong',
-                    'description': 'Adopt a Mediterranean-style diet rich in fruits, vegetables, whole grains, lean proteins, and healthy fats.',
-                    'expected_outcome': 'Reduce cardiovascular risk by 20-30%, improve insulin sensitivity',
-                    'action_steps': [
-                        'Increase olive oil consumption to 2-3 tablespoons daily',
-                        'Eat fish 2-3 times per week',
-                        'Consume 5-7 servings of fruits and vegetables daily',
-                        'Choose whole grains over refined carbohydrates',
-                        'Include nuts and seeds in daily diet'
-                    ],
-                    'target_conditions': ['pre_diabetes', 'hypertension', 'metabolic_syndrome'],
-                    'duration': '3-6 months'
-                },
-                {
-                    'title': 'DASH Diet Implementation',
-                    'priority': 'High',
-                    'evidence_level': 'Strong',
-                    'description': 'Follow Dietary Approaches to Stop Hypertension (DASH) diet to reduce blood pressure.',
-                    'expected_outcome': 'Reduce systolic BP by 8-14 mmHg',
-                    'action_steps': [
-                        'Limit sodium intake to less than 2,300mg daily',
-                        'Increase potassium-rich foods (bananas, spinach, beans)',
-                        'Consume 4-5 servings of fruits and vegetables daily',
-                        'Choose low-fat dairy products',
-                        'Limit red meat and processed foods'
-                    ],
-                    'target_conditions': ['hypertension'],
-                    'duration': '2-4 weeks to see initial results'
-                },
-                {
-                    'title': 'Carbohydrate Counting',
-                    'priority': 'Medium',
-                    'evidence_level': 'Moderate',
-                    'description': 'Learn to count carbohydrates to better manage blood glucose levels.',
-                    'expected_outcome': 'Improve glucose control and reduce HbA1c by 0.5-1%',
-                    'action_steps': [
-                        'Track carbohydrate intake for 2 weeks',
-                        'Aim for 45-60g carbs per meal',
-                        'Choose complex carbohydrates over simple sugars',
-                        'Use measuring cups and food scales initially',
-                        'Keep a food diary'
-                    ],
-                    'target_conditions': ['pre_diabetes'],
-                    'duration': '4-8 weeks'
-                }
+# Comprehensive intervention library, built once at import and shared read-only
+# by every engine (get_interventions overlays personalized fields on top of entries)
+INTERVENTION_LIBRARY = {
+    'dietary_interventions': [
+        {
+            'title': 'Mediterranean Diet Adoption',
+            'priority': 'High',
+            'evidence_level': 'Strong',
+            'description': 'Adopt a Mediterranean-style diet rich in fruits, vegetables, whole grains, lean proteins, and healthy fats.',
+            'expected_outcome': 'Reduce cardiovascular risk by 20-30%, improve insulin sensitivity',
+            'action_steps': [
+                'Increase olive oil consumption to 2-3 tablespoons daily',
+                'Eat fish 2-3 times per week',
+                'Consume 5-7 servings of fruits and vegetables daily',
+                'Choose whole grains over refined carbohydrates',
+                'Include nuts and seeds in daily diet'
+            ],
+            'target_conditions': ['pre_diabetes', 'hypertension', 'metabolic_syndrome'],
+            'duration': '3-6 months'
+        },
+        {
+            'title': 'DASH Diet Implementation',
+            'priority': 'High',
+            'evidence_level': 'Strong',
+            'description': 'Follow Dietary Approaches to Stop Hypertension (DASH) diet to reduce blood pressure.',
+            'expected_outcome': 'Reduce systolic BP by 8-14 mmHg',
+            'action_steps': [
+                'Limit sodium intake to less than 2,300mg daily',
+                'Increase potassium-rich foods (bananas, spinach, beans)',
+                'Consume 4-5 servings of fruits and vegetables daily',
+                'Choose low-fat dairy products',
+                'Limit red meat and processed foods'
+            ],
+            'target_conditions': ['hypertension'],
+            'duration': '2-4 weeks to see initial results'
+        },
+        {
+            'title': 'Carbohydrate Counting',
+            'priority': 'Medium',
+            'evidence_level': 'Moderate',
+            'description': 'Learn to count carbohydrates to better manage blood glucose levels.',
+            'expected_outcome': 'Improve glucose control and reduce HbA1c by 0.5-1%',
+            'action_steps': [
+                'Track carbohydrate intake for 2 weeks',
+                'Aim for 45-60g carbs per meal',
+                'Choose complex carbohydrates over simple sugars',
+                'Use measuring cups and food scales initially',
+                'Keep a food diary'
+            ],
+            'target_conditions': ['pre_diabetes'],
+            'duration': '4-8 weeks'
+        }
+    ],
+    'exercise_interventions': [
+        {
+            'title': 'Progressive Aerobic Exercise Program',
+            'priority': 'High',
+            'evidence_level': 'Strong',
+            'description': 'Structured aerobic exercise program starting with low intensity and gradually increasing.',
+            'expected_outcome': 'Reduce cardiovascular risk, improve insulin sensitivity, lower blood pressure',
+            'action_steps': [
+                'Start with 10-15 minutes of walking daily',
+                'Gradually increase to 30 minutes, 5 days per week',
+                'Include activities like swimming, cycling, or dancing',
+                'Monitor heart rate during exercise',
+                'Track progress weekly'
+            ],
+            'target_conditions': ['pre_diabetes', 'hypertension', 'metabolic_syndrome'],
+            'duration': '8-12 weeks'
+        },
+        {
+            'title': 'Resistance Training Program',
+            'priority': 'Medium',
+            'evidence_level': 'Moderate',
+            'description': 'Add resistance training to improve muscle mass and metabolic health.',
+            'expected_outcome': 'Increase muscle mass, improve glucose metabolism, enhance bone density',
+            'action_steps': [
+                'Perform resistance exercises 2-3 times per week',
+                'Start with bodyweight exercises (push-ups, squats)',
+                'Progress to light weights or resistance bands',
+                'Focus on major muscle groups',
+                'Allow 48 hours rest between sessions'
+            ],
+            'target_conditions': ['pre_diabetes', 'metabolic_syndrome'],
+            'duration': '6-8 weeks'
+        },
+        {
+            'title': 'High-Intensity Interval Training (HIIT)',
+            'priority': 'Medium',
+            'evidence_level': 'Moderate',
+            'description': 'Short bursts of high-intensity exercise followed by recovery periods.',
+            'expected_outcome': 'Improve cardiovascular fitness, enhance insulin sensitivity',
+            'action_steps': [
+                'Start with 2-3 HIIT sessions per week',
+                'Alternate 30 seconds high intensity with 90 seconds recovery',
+                'Total session duration: 15-20 minutes',
+                'Include exercises like burpees, mountain climbers, jumping jacks',
+                'Gradually increase intensity and duration'
+            ],
+            'target_conditions': ['pre_diabetes', 'metabolic_syndrome'],
+            'duration': '4-6 weeks'
+        }
+    ],
+    'lifestyle_interventions': [
+        {
+            'title': 'Stress Management Program',
+            'priority': 'High',
+            'evidence_level': 'Moderate',
+            'description': 'Implement stress reduction techniques to improve overall health outcomes.',
+            'expected_outcome': 'Reduce cortisol levels, improve sleep quality, lower blood pressure',
+            'action_steps': [
+                'Practice mindfulness meditation 10-15 minutes daily',
+                'Try deep breathing exercises during stressful moments',
+                'Engage in relaxing activities (yoga, tai chi, reading)',
+                'Maintain social connections and support networks',
+                'Consider professional counseling if needed'
+            ],
+            'target_conditions': ['hypertension', 'metabolic_syndrome'],
+            'duration': '6-8 weeks'
+        },
+        {
+            'title': 'Sleep Hygiene Improvement',
+            'priority': 'Medium',
+            'evidence_level': 'Moderate',
+            'description': 'Optimize sleep quality and duration to support metabolic health.',
+            'expected_outcome': 'Improve insulin sensitivity, reduce appetite hormones, lower stress',
+            'action_steps': [
+                'Maintain consistent sleep schedule (7-9 hours nightly)',
+                'Create a relaxing bedtime routine',
+                'Limit screen time 1 hour before bed',
+                'Keep bedroom cool, dark, and quiet',
+                'Avoid caffeine and large meals before bedtime'
             ],
-            'exercise_interventions': [
-                {
-                    'title': 'Progressive Aerobic Exercise Program',
-                    'priority': 'High',
-                    'evidence_level': 'Strong',
-                    'description': 'Structured aerobic exercise program starting with low intensity and gradually increasing.',
-                    'expected_outcome': 'Reduce cardiovascular risk, improve insulin sensitivity, lower blood pressure',
-                    'action_steps': [
-                        'Start with 10-15 minutes of walking daily',
-                        'Gradually increase to 30 minutes, 5 days per week',
-                        'Include activities like swimming, cycling, or dancing',
-                        'Monitor heart rate during exercise',
-                        'Track progress weekly'
-                    ],
-                    'target_conditions': ['pre_diabetes', 'hypertension', 'metabolic_syndrome'],
-                    'duration': '8-12 weeks'
-                },
-                {
-                    'title': 'Resistance Training Program',
-                    'priority': 'Medium',
-                    'evidence_level': 'Moderate',
-                    'description': 'Add resistance training to improve muscle mass and metabolic health.',
-                    'expected_outcome': 'Increase muscle mass, improve glucose metabolism, enhance bone density',
-                    'action_steps': [
-                        'Perform resistance exercises 2-3 times per week',
-                        'Start with bodyweight exercises (push-ups, squats)',
-                        'Progress to light weights or resistance bands',
-                        'Focus on major muscle groups',
-                        'Allow 48 hours rest between sessions'
-                    ],
-                    'target_conditions': ['pre_diabetes', 'metabolic_syndrome'],
-                    'duration': '6-8 weeks'
-                },
-                {
-                    'title': 'High-Intensity Interval Training (HIIT)',
-                    'priority': 'Medium',
-                    'evidence_level': 'Moderate',
-                    'description': 'Short bursts of high-intensity exercise followed by recovery periods.',
-                    'expected_outcome': 'Improve cardiovascular fitness, enhance insulin sensitivity',
-                    'action_steps': [
-                        'Start with 2-3 HIIT sessions per week',
-                        'Alternate 30 seconds high intensity with 90 seconds recovery',
-                        'Total session duration: 15-20 minutes',
-                        'Include exercises like burpees, mountain climbers, jumping jacks',
-                        'Gradually increase intensity and duration'
-                    ],
-                    'target_conditions': ['pre_diabetes', 'metabolic_syndrome'],
-                    'duration': '4-6 weeks'
-                }
+            'target_conditions': ['pre_diabetes', 'metabolic_syndrome'],
+            'duration': '2-4 weeks'
+        },
+        {
+            'title': 'Smoking Cessation Program',
+            'priority': 'Critical',
+            'evidence_level': 'Strong',
+            'description': 'Comprehensive smoking cessation program with behavioral and pharmacological support.',
+            'expected_outcome': 'Dramatically reduce cardiovascular risk, improve lung function',
+            'action_steps': [
+                'Set a quit date within 2 weeks',
+                'Remove smoking triggers from environment',
+                'Consider nicotine replacement therapy',
+                'Join a smoking cessation support group',
+                'Develop alternative coping strategies'
             ],
-            'lifestyle_interventions': [
-                {
-                    'title': 'Stress Management Program',
-                    'priority': 'High',
-                    'evidence_level': 'Moderate',
-                    'description': 'Implement stress reduction techniques to improve overall health outcomes.',
-                    'expected_outcome': 'Reduce cortisol levels, improve sleep quality, lower blood pressure',
-                    'action_steps': [
-                        'Practice mindfulness meditation 10-15 minutes daily',
-                        'Try deep breathing exercises during stressful moments',
-                        'Engage in relaxing activities (yoga, tai chi, reading)',
-                        'Maintain social connections and support networks',
-                        'Consider professional counseling if needed'
-                    ],
-                    'target_conditions': ['hypertension', 'metabolic_syndrome'],
-                    'duration': '6-8 weeks'
-                },
-                {
-                    'title': 'Sleep Hygiene Improvement',
-                    'priority': 'Medium',
-                    'evidence_level': 'Moderate',
-                    'description': 'Optimize sleep quality and duration to support metabolic health.',
-                    'expected_outcome': 'Improve insulin sensitivity, reduce appetite hormones, lower stress',
-                    'action_steps': [
-                        'Maintain consistent sleep schedule (7-9 hours nightly)',
-                        'Create a relaxing bedtime routine',
-                        'Limit screen time 1 hour before bed',
-                        'Keep bedroom cool, dark, and quiet',
-                        'Avoid caffeine and large meals before bedtime'
-                    ],
-                    'target_conditions': ['pre_diabetes', 'metabolic_syndrome'],
-                    'duration': '2-4 weeks'
-                },
-                {
-                    'title': 'Smoking Cessation Program',
-                    'priority': 'Critical',
-                    'evidence_level': 'Strong',
-                    'description': 'Comprehensive smoking cessation program with behavioral and pharmacological support.',
-                    'expected_outcome': 'Dramatically reduce cardiovascular risk, improve lung function',
-                    'action_steps': [
-                        'Set a quit date within 2 weeks',
-                        'Remove smoking triggers from environment',
-                        'Consider nicotine replacement therapy',
-                        'Join a smoking cessation support group',
-                        'Develop alternative coping strategies'
-                    ],
-                    'target_conditions': ['hypertension', 'metabolic_syndrome'],
-                    'duration': '12-16 weeks'
-                }
+            'target_conditions': ['hypertension', 'metabolic_syndrome'],
+            'duration': '12-16 weeks'
+        }
+    ],
+    'monitoring_interventions': [
+        {
+            'title': 'Home Blood Pressure Monitoring',
+            'priority': 'High',
+            'evidence_level': 'Strong',
+            'description': 'Regular home blood pressure monitoring to track hypertension management.',
+            'expected_outcome': 'Better blood pressure control, early detection of changes',
+            'action_steps': [
+                'Measure blood pressure twice daily at same times',
+                'Use validated home blood pressure monitor',
+                'Record readings in log or app',
+                'Report concerning readings to healthcare provider',
+                'Bring logs to medical appointments'
+            ],
+            'target_conditions': ['hypertension'],
+            'duration': 'Ongoing'
+        },
+        {
+            'title': 'Glucose Self-Monitoring',
+            'priority': 'Medium',
+            'evidence_level': 'Moderate',
+            'description': 'Regular blood glucose monitoring to track diabetes prevention efforts.',
+            'expected_outcome': 'Better glucose control awareness, early intervention',
+            'action_steps': [
+                'Check fasting glucose 2-3 times per week',
+                'Monitor post-meal glucose occasionally',
+                'Track patterns in glucose readings',
+                'Correlate readings with diet and exercise',
+                'Share data with healthcare provider'
+            ],
+            'target_conditions': ['pre_diabetes'],
+            'duration': 'Ongoing'
+        },
+        {
+            'title': 'Weight Management Tracking',
+            'priority': 'Medium',
+            'evidence_level': 'Moderate',
+            'description': 'Regular weight monitoring and body composition tracking.',
+            'expected_outcome': 'Maintain healthy weight, track progress',
+            'action_steps': [
+                'Weigh yourself weekly at same time of day',
+                'Measure waist circumference monthly',
+                'Track BMI changes over time',
+                'Monitor clothing fit as additional indicator',
+                'Set realistic weight loss goals (1-2 lbs/week)'
             ],
-            'monitoring_interventions': [
-                {
-                    'title': 'Home Blood Pressure Monitoring',
-                    'priority': 'High',
-                    'evidence_level': 'Strong',
-                    'description': 'Regular home blood pressure monitoring to track hypertension management.',
-                    'expected_outcome': 'Better blood pressure control, early detection of changes',
-                    'action_steps': [
-                        'Measure blood pressure twice daily at same times',
-                        'Use validated home blood pressure monitor',
-                        'Record readings in log or app',
-                        'Report concerning readings to healthcare provider',
-                        'Bring logs to medical appointments'
-                    ],
-                    'target_conditions': ['hypertension'],
-                    'duration': 'Ongoing'
-                },
-                {
-                    'title': 'Glucose Self-Monitoring',
-                    'priority': 'Medium',
-                    'evidence_level': 'Moderate',
-                    'description': 'Regular blood glucose monitoring to track diabetes prevention efforts.',
-                    'expected_outcome': 'Better glucose control awareness, early intervention',
-                    'action_steps': [
-                        'Check fasting glucose 2-3 times per week',
-                        'Monitor post-meal glucose occasionally',
-                        'Track patterns in glucose readings',
-                        'Correlate readings with diet and exercise',
-                        'Share data with healthcare provider'
-                    ],
-                    'target_conditions': ['pre_diabetes'],
-                    'duration': 'Ongoing'
-                },
-                {
-                    'title': 'Weight Management Tracking',
-                    'priority': 'Medium',
-                    'evidence_level': 'Moderate',
-                    'description': 'Regular weight monitoring and body composition tracking.',
-                    'expected_outcome': 'Maintain healthy weight, track progress',
-                    'action_steps': [
-                        'Weigh yourself weekly at same time of day',
-                        'Measure waist circumference monthly',
-                        'Track BMI changes over time',
-                        'Monitor clothing fit as additional indicator',
-                        'Set realistic weight loss goals (1-2 lbs/week)'
-                    ],
-                    'target_conditions': ['pre_diabetes', 'metabolic_syndrome'],
-                    'duration': 'Ongoing'
-                }
-            ]
+            'target_conditions': ['pre_diabetes', 'metabolic_syndrome'],
+            'duration': 'Ongoing'
         }
+    ]
+}
+
+def _freeze_library(library):
+    """Read-only copy of the library: tuples for every list, a proxy for the category map"""
+    return MappingProxyType({
+        category: tuple(
+            {
+                **intervention,
+                'action_steps': tuple(intervention['action_steps']),
+                'target_conditions': tuple(intervention['target_conditions'])
+            }
+            for intervention in interventions
+        )
+        for category, interventions in library.items()
+    })
+
+# The library is shared by every engine and session, so it is frozen rather than
+# relying on callers to copy before mutating
+INTERVENTION_LIBRARY = _freeze_library(INTERVENTION_LIBRARY)
+
+def _build_condition_index(library):
+    """Index library entries by target condition, plus the general High/Critical entries"""
+    condition_index = {}
+    general_interventions = []
+    position = 0
+    for category, interventions in library.items():
+        for intervention in interventions:
+            # position is the entry's order in the whole library, used to keep
+            # the recommendations in library order
+            entry = (position, category, intervention)
+            for condition in intervention['target_conditions']:
+                condition_index.setdefault(condition, []).append(entry)
+            if intervention['priority'] in ['High', 'Critical']:
+                general_interventions.append(entry)
+            position += 1
+    return condition_index, general_interventions
+
+CONDITION_INDEX, GENERAL_INTERVENTIONS = _build_condition_index(INTERVENTION_LIBRARY)
+
+# Library category of each intervention, by title
+INTERVENTION_CATEGORY = {
+    intervention['title']: category
+    for category, interventions in INTERVENTION_LIBRARY.items()
+    for intervention in interventions
+}
+
+# Progress metrics tracked for each intervention category (immutable, shared)
+CATEGORY_METRICS = {
+    'dietary_interventions': ('weight', 'waist_circumference', 'glucose_fasting', 'cholesterol'),
+    'exercise_interventions': ('exercise_minutes_per_week', 'resting_heart_rate', 'weight', 'bmi'),
+    'lifestyle_interventions': ('sleep_hours', 'stress_level', 'systolic_bp', 'diastolic_bp'),
+    'monitoring_interventions': ('measurement_frequency', 'target_range_adherence')
+}
+DEFAULT_PROGRESS_METRICS = ('weight', 'bmi')
+
+# Metric-specific recommendation templates; each call shallow-copies one and adds
+# the personalized note (action steps may use {value} for the patient's metric)
+CALORIE_RESTRICTION_TEMPLATE = {
+    'title': 'Calorie Restriction for Weight Loss',
+    'priority': 'High',
+    'evidence_level': 'Strong',
+    'description': 'Implement moderate calorie restriction to achieve healthy weight loss.',
+    'expected_outcome': 'Lose 1-2 pounds per week, improve metabolic health',
+    'action_steps': [
+        'Reduce daily calorie intake by 500-750 calories',
+        'Focus on portion control',
+        'Use smaller plates and bowls',
+        'Eat slowly and mindfully',
+        'Track food intake with app or journal'
+    ],
+    'target_conditions': ['pre_diabetes', 'metabolic_syndrome'],
+    'duration': '3-6 months'
+}
+
+SODIUM_REDUCTION_TEMPLATE = {
+    'title': 'Sodium Reduction Protocol',
+    'priority': 'High',
+    'evidence_level': 'Strong',
+    'description': 'Aggressive sodium reduction to lower blood pressure.',
+    'expected_outcome': 'Reduce systolic BP by 2-8 mmHg',
+    'action_steps': [
+        'Limit sodium to less than 1,500mg daily',
+        'Read nutrition labels carefully',
+        'Cook meals at home more often',
+        'Use herbs and spices instead of salt',
+        'Avoid processed and restaurant foods'
+    ],
+    'target_conditions': ['hypertension'],
+    'duration': '2-4 weeks'
+}
+
+GLYCEMIC_INDEX_TEMPLATE = {
+    'title': 'Glycemic Index Management',
+    'priority': 'High',
+    'evidence_level': 'Moderate',
+    'description': 'Focus on low glycemic index foods to improve glucose control.',
+    'expected_outcome': 'Stabilize blood glucose levels, reduce post-meal spikes',
+    'action_steps': [
+        'Choose foods with GI less than 55',
+        'Pair carbohydrates with protein or healthy fats',
+        'Avoid high-GI foods (white bread, sugary drinks)',
+        'Eat regular, smaller meals throughout the day',
+        'Monitor blood glucose response to different foods'
+    ],
+    'target_conditions': ['pre_diabetes'],
+    'duration': '4-6 weeks'
+}
+
+ACTIVITY_INCREASE_TEMPLATE = {
+    'title': 'Physical Activity Increase Plan',
+    'priority': 'High',
+    'evidence_level': 'Strong',
+    'description': 'Gradual increase in physical activity to meet recommended guidelines.',
+    'expected_outcome': 'Improve cardiovascular health, enhance insulin sensitivity',
+    'action_steps': [
+        'Increase weekly exercise from {value} to 150 minutes',
+        'Add 10-15 minutes of activity every week',
+        'Include activities you enjoy (dancing, hiking, sports)',
+        'Use fitness tracker or app to monitor progress',
+        'Find exercise buddy for accountability'
+    ],
+    'target_conditions': ['pre_diabetes', 'hypertension', 'metabolic_syndrome'],
+    'duration': '6-8 weeks'
+}
+
+# Metric-specific recommendation rules, checked in order:
+# (metric, default when missing, comparison, threshold, category, template, note)
+METRIC_RULES = (
+    ('bmi', 25, operator.gt, 30, 'dietary_interventions',
+     CALORIE_RESTRICTION_TEMPLATE, 'Recommended due to BMI of {value:.1f}'),
+    ('systolic_bp', 120, operator.gt, 130, 'lifestyle_interventions',
+     SODIUM_REDUCTION_TEMPLATE, 'Recommended due to systolic BP of {value} mmHg'),
+    ('glucose_fasting', 90, operator.gt, 100, 'dietary_interventions',
+     GLYCEMIC_INDEX_TEMPLATE, 'Recommended due to fasting glucose of {value} mg/dL'),
+    ('exercise_minutes_per_week', 150, operator.lt, 150, 'exercise_interventions',
+     ACTIVITY_INCREASE_TEMPLATE, 'Current activity level: {value} minutes/week')
+)
+# Whether each rule's template has action steps to fill with {value}
+METRIC_RULE_FORMATS_STEPS = tuple(
+    any('{value}' in step for step in template['action_steps'])
+    for _, _, _, _, _, template, _ in METRIC_RULES
+)
+
+class InterventionEngine:
+    intervention_library = INTERVENTION_LIBRARY
+    condition_index = CONDITION_INDEX
+    general_interventions = GENERAL_INTERVENTIONS
     
-    def get_interventions(self, health_data, risk_scores):
+    def get_interventions(self, latest_data, risk_scores):
         """Get personalized intervention recommendations"""
-        if health_data.empty:
+        # latest_data is a plain mapping of the latest entry's metrics, so no
+        # pandas row has to be materialized here
+        if not latest_data:
             return {}
         
-        latest_data = health_data.iloc[-1]
-        personalized_interventions = {}
+        return self._group_by_category(self.iter_interventions(latest_data, risk_scores))
+    
+    def iter_interventions(self, latest_data, risk_scores):
+        """Yield (category, intervention) recommendations in display order"""
+        # Entries are personalized only as they are consumed, so callers that
+        # need just the first few per category can stop early
+        if not latest_data:
+            return
         
-        # Determine risk levels
-        high_risk_conditions = [condition for condition, score in risk_scores.items() if score > 0.7]
-        medium_risk_conditions = [condition for condition, score in risk_scores.items() if 0.4 < score <= 0.7]
+        # Determine risk levels with one mask per level over the score array
+        conditions = np.array(list(risk_scores), dtype=object)
+        scores = np.fromiter(risk_scores.values(), dtype=float, count=len(conditions))
+        high_mask = scores > 0.7
+        medium_mask = (scores > 0.4) & ~high_mask
         
-        # Get interventions for each category
-        for category, interventions in self.intervention_library.items():
-            personalized_interventions[category] = []
-            
-            for intervention in interventions:
-                # Check if intervention is relevant for current risk conditions
-                target_conditions = intervention.get('target_conditions', [])
-                
-                # Prioritize interventions for high-risk conditions
-                if any(condition in high_risk_conditions for condition in target_conditions):
-                    intervention_copy = intervention.copy()
-                    intervention_copy['priority'] = 'Critical'
-                    intervention_copy['personalized_note'] = f"High priority due to elevated risk in {', '.join(high_risk_conditions)}"
-                    personalized_interventions[category].append(intervention_copy)
-                elif any(condition in medium_risk_conditions for condition in target_conditions):
-                    intervention_copy = intervention.copy()
-                    intervention_copy['personalized_note'] = f"Recommended due to moderate risk in {', '.join(medium_risk_conditions)}"
-                    personalized_interventions[category].append(intervention_copy)
-                else:
-                    # Include general interventions for overall health
-                    if intervention['priority'] in ['High', 'Critical']:
-                        intervention_copy = intervention.copy()
-                        intervention_copy['personalized_note'] = "General health maintenance"
-                        personalized_interventions[category].append(intervention_copy)
+        yield from self._iter_matches(conditions[high_mask].tolist(), conditions[medium_mask].tolist())
         
         # Add specific recommendations based on individual metrics
-        personalized_interventions = self._add_specific_recommendations(
-            personalized_interventions, latest_data
-        )
+        yield from self._iter_specific_recommendations(latest_data)
+    
+    def get_interventions_batch(self, health_df, risk_df):
+        """Get personalized intervention recommendations for many patients"""
+        # Each row of health_df is one patient's latest metrics and the row with
+        # the same index in risk_df holds their risk scores. Thresholds are
+        # evaluated column-wise for all patients at once
+        if health_df.empty:
+            return {}
+        
+        risk_df = risk_df.reindex(health_df.index)
+        conditions = np.array(list(risk_df.columns), dtype=object)
+        scores = risk_df.to_numpy(dtype=float)
+        high_mask = scores > 0.7
+        medium_mask = (scores > 0.4) & ~high_mask
+        
+        metrics = {
+            metric: (health_df[metric] if metric in health_df.columns else pd.Series(default, index=health_df.index)).to_numpy()
+            for metric, default, *_ in METRIC_RULES
+        }
+        flags = np.column_stack(self._specific_recommendation_flags(metrics))
         
-        return personalized_interventions
+        # Patients with no metric-specific recommendation skip that step entirely
+        has_specific = flags.any(axis=1)
+        
+        results = {}
+        for i, patient in enumerate(health_df.index):
+            recommendations = self._iter_matches(
+                conditions[high_mask[i]].tolist(), conditions[medium_mask[i]].tolist()
+            )
+            if has_specific[i]:
+                specific = self._iter_specific_recommendations(
+                    {metric: values[i] for metric, values in metrics.items()},
+                    flags[i]
+                )
+                recommendations = chain(recommendations, specific)
+            results[patient] = self._group_by_category(recommendations)
+        
+        return results
+    
+    def _group_by_category(self, recommendations):
+        """Collect (category, intervention) pairs into per-category lists"""
+        grouped = {category: [] for category in self.intervention_library}
+        for category, intervention in recommendations:
+            grouped[category].append(intervention)
+        return grouped
     
-    def _add_specific_recommendations(self, interventions, latest_data):
-        """Add specific recommendations based on individual health metrics"""
+    def _iter_matches(self, high_risk_conditions, medium_risk_conditions):
+        """Yield library interventions for the given high and moderate risk conditions"""
+        # Fast path for patients without elevated risk: only the general
+        # entries apply, and they are already in library order
+        if not high_risk_conditions and not medium_risk_conditions:
+            for position, category, intervention in self.general_interventions:
+                yield category, ChainMap({'personalized_note': "General health maintenance"}, intervention)
+            return
         
-        # BMI-specific recommendations
-        bmi = latest_data.get('bmi', 25)
-        if bmi > 30:
-            interventions['dietary_interventions'].append({
-                'title': 'Calorie Restriction for Weight Loss',
-                'priority': 'High',
-                'evidence_level': 'Strong',
-                'description': 'Implement moderate calorie restriction to achieve healthy weight loss.',
-                'expected_outcome': 'Lose 1-2 pounds per week, improve metabolic health',
-                'action_steps': [
-                    'Reduce daily calorie intake by 500-750 calories',
-                    'Focus on portion control',
-                    'Use smaller plates and bowls',
-                    'Eat slowly and mindfully',
-                    'Track food intake with app or journal'
-                ],
-                'target_conditions': ['pre_diabetes', 'metabolic_syndrome'],
-                'duration': '3-6 months',
-                'personalized_note': f'Recommended due to BMI of {bmi:.1f}'
-            })
+        # Look up matching interventions by condition; the first match for an
+        # entry wins, so high risk takes precedence over moderate and general
+        matches = {}
         
-        # Blood pressure specific recommendations
-        systolic_bp = latest_data.get('systolic_bp', 120)
-        if systolic_bp > 130:
-            interventions['lifestyle_interventions'].append({
-                'title': 'Sodium Reduction Protocol',
-                'priority': 'High',
-                'evidence_level': 'Strong',
-                'description': 'Aggressive sodium reduction to lower blood pressure.',
-                'expected_outcome': 'Reduce systolic BP by 2-8 mmHg',
-                'action_steps': [
-                    'Limit sodium to less than 1,500mg daily',
-                    'Read nutrition labels carefully',
-                    'Cook meals at home more often',
-                    'Use herbs and spices instead of salt',
-                    'Avoid processed and restaurant foods'
-                ],
-                'target_conditions': ['hypertension'],
-                'duration': '2-4 weeks',
-                'personalized_note': f'Recommended due to systolic BP of {systolic_bp} mmHg'
-            })
+        # Prioritize interventions for high-risk conditions
+        for condition in high_risk_conditions:
+            for position, category, intervention in self.condition_index.get(condition, []):
+                matches.setdefault(position, (category, intervention, 'high'))
         
-        # Glucose-specific recommendations
-        glucose = latest_data.get('glucose_fasting', 90)
-        if glucose > 100:
-            interventions['dietary_interventions'].append({
-                'title': 'Glycemic Index Management',
-                'priority': 'High',
-                'evidence_level': 'Moderate',
-                'description': 'Focus on low glycemic index foods to improve glucose control.',
-                'expected_outcome': 'Stabilize blood glucose levels, reduce post-meal spikes',
-                'action_steps': [
-                    'Choose foods with GI less than 55',
-                    'Pair carbohydrates with protein or healthy fats',
-                    'Avoid high-GI foods (white bread, sugary drinks)',
-                    'Eat regular, smaller meals throughout the day',
-                    'Monitor blood glucose response to different foods'
-                ],
-                'target_conditions': ['pre_diabetes'],
-                'duration': '4-6 weeks',
-                'personalized_note': f'Recommended due to fasting glucose of {glucose} mg/dL'
-            })
+        for condition in medium_risk_conditions:
+            for position, category, intervention in self.condition_index.get(condition, []):
+                matches.setdefault(position, (category, intervention, 'medium'))
         
-        # Exercise recommendations based on current activity level
-        exercise_minutes = latest_data.get('exercise_minutes_per_week', 150)
-        if exercise_minutes < 150:
-            interventions['exercise_interventions'].append({
-                'title': 'Physical Activity Increase Plan',
-                'priority': 'High',
-                'evidence_level': 'Strong',
-                'description': 'Gradual increase in physical activity to meet recommended guidelines.',
-                'expected_outcome': 'Improve cardiovascular health, enhance insulin sensitivity',
-                'action_steps': [
-                    f'Increase weekly exercise from {exercise_minutes} to 150 minutes',
-                    'Add 10-15 minutes of activity every week',
-                    'Include activities you enjoy (dancing, hiking, sports)',
-                    'Use fitness tracker or app to monitor progress',
-                    'Find exercise buddy for accountability'
-                ],
-                'target_conditions': ['pre_diabetes', 'hypertension', 'metabolic_syndrome'],
-                'duration': '6-8 weeks',
-                'personalized_note': f'Current activity level: {exercise_minutes} minutes/week'
-            })
+        # Include general interventions for overall health
+        for position, category, intervention in self.general_interventions:
+            matches.setdefault(position, (category, intervention, 'general'))
+        
+        # Notes are built once per call, not per matching entry
+        high_risk_note = f"High priority due to elevated risk in {', '.join(high_risk_conditions)}"
+        medium_risk_note = f"Recommended due to moderate risk in {', '.join(medium_risk_conditions)}"
+        
+        # Yield in library order. Personalized fields are overlaid on the shared
+        # library entry (a ChainMap) rather than copying it
+        for position in sorted(matches):
+            category, intervention, level = matches[position]
+            if level == 'high':
+                overlay = {'priority': 'Critical', 'personalized_note': high_risk_note}
+            elif level == 'medium':
+                overlay = {'personalized_note': medium_risk_note}
+            else:
+                overlay = {'personalized_note': "General health maintenance"}
+            yield category, ChainMap(overlay, intervention)
+    
+    def _specific_recommendation_flags(self, metrics):
+        """Which metric-specific recommendations apply (scalars or per-patient arrays)"""
+        return tuple(
+            compare(metrics[metric], threshold)
+            for metric, _, compare, threshold, *_ in METRIC_RULES
+        )
+    
+    def _iter_specific_recommendations(self, latest_data, flags=None):
+        """Yield specific recommendations based on individual health metrics"""
+        values = {metric: latest_data.get(metric, default) for metric, default, *_ in METRIC_RULES}
+        if flags is None:
+            flags = self._specific_recommendation_flags(values)
         
-        return interventions
+        rules = zip(METRIC_RULES, METRIC_RULE_FORMATS_STEPS, flags)
+        for (metric, _, _, _, category, template, note), formats_steps, applies in rules:
+            if not applies:
+                continue
+            value = values[metric]
+            recommendation = {**template, 'personalized_note': note.format(value=value)}
+            if formats_steps:
+                recommendation['action_steps'] = [step.format(value=value) for step in template['action_steps']]
+            yield category, recommendation
     
-    def get_intervention_progress_template(self, intervention):
+    def get_intervention_progress_template(self, intervention, start_date=None):
         """Get progress tracking template for intervention"""
+        # Callers emitting many templates can stamp the time once and pass it in
+        if start_date is None:
+            start_date = datetime.now()
+        
         return {
             'intervention_title': intervention['title'],
-            'start_date': datetime.now(),
+            'start_date': start_date,
             'target_duration': intervention.get('duration', 'Ongoing'),
             'progress_metrics': self._get_progress_metrics(intervention),
             'weekly_goals': self._get_weekly_goals(intervention),
@@ -356,19 +511,9 @@ class InterventionEngine:
     
     def _get_progress_metrics(self, intervention):
         """Define progress metrics for intervention"""
-        category_metrics = {
-            'dietary_interventions': ['weight', 'waist_circumference', 'glucose_fasting', 'cholesterol'],
-            'exercise_interventions': ['exercise_minutes_per_week', 'resting_heart_rate', 'weight', 'bmi'],
-            'lifestyle_interventions': ['sleep_hours', 'stress_level', 'systolic_bp', 'diastolic_bp'],
-            'monitoring_interventions': ['measurement_frequency', 'target_range_adherence']
-        }
-        
         # Determine category
-        for category, interventions in self.intervention_library.items():
-            if intervention in interventions:
-                return category_metrics.get(category, ['weight', 'bmi'])
-        
-        return ['weight', 'bmi']
+        category = INTERVENTION_CATEGORY.get(intervention.get('title'))
+        return CATEGORY_METRICS.get(category, DEFAULT_PROGRESS_METRICS)
     
     def _get_weekly_goals(self, intervention):
         """Define weekly goals for intervention"""
@@ -1,14 +1,47 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
+import numpy as np
 from datetime import datetime, timedelta
-from models.data_processor import DataProcessor
+from utils.caching import cached_health_scores, cached_trends
+
+# Plotly is imported inside the chart-drawing methods, so a page with no (or too
+# little) data never loads it
+
+# Overview metrics: (column, label, value format, change format)
+OVERVIEW_METRICS = (
+    ('bmi', "BMI Change", '.1f', '+.1f'),
+    ('systolic_bp', "Systolic BP Change", '.0f', '+.0f'),
+    ('glucose_fasting', "Glucose Change", '.0f', '+.0f'),
+    ('total_cholesterol', "Cholesterol Change", '.0f', '+.0f')
+)
+
+# Metrics offered on the detailed progress charts
+DETAIL_METRICS = (
+    'bmi', 'systolic_bp', 'diastolic_bp', 'glucose_fasting',
+    'total_cholesterol', 'hdl_cholesterol', 'triglycerides',
+    'exercise_minutes_per_week', 'sleep_hours', 'stress_level'
+)
+METRIC_TITLES = {metric: metric.replace('_', ' ').title() for metric in DETAIL_METRICS}
+
+# Metrics whose decrease counts as improvement in progress insights
+LOWER_IS_BETTER = frozenset({'bmi', 'systolic_bp', 'diastolic_bp', 'glucose_fasting'})
+
+# Target ranges drawn on the detailed progress charts
+TARGET_RANGES = {
+    'bmi': (18.5, 24.9),
+    'systolic_bp': (90, 120),
+    'diastolic_bp': (60, 80),
+    'glucose_fasting': (70, 100),
+    'total_cholesterol': (150, 200),
+    'hdl_cholesterol': (40, 100),
+    'triglycerides': (50, 150)
+}
+TARGET_LABELS = {metric: f"Target: {low}-{high}" for metric, (low, high) in TARGET_RANGES.items()}
 
 class ProgressTracker:
-    def __init__(self, health_data_manager):
+    def __init__(self, health_data_manager, data_processor):
         self.health_data_manager = health_data_manager
-        self.data_processor = DataProcessor()
+        self.data_processor = data_processor
     
     def render(self):
         st.header("📈 Progress Tracking")
@@ -26,8 +59,8 @@ class ProgressTracker:
         # Detailed progress charts
         self._display_detailed_progress(all_data)
         
-        # Goal tracking
-        self._display_goal_tracking(all_data)
+        # Goal tracking (dated against one "today" for the whole rerun)
+        self._display_goal_tracking(all_data, datetime.now().date())
         
         # Intervention progress
         self._display_intervention_progress()
@@ -43,76 +76,42 @@ class ProgressTracker:
             st.warning("Need at least 2 data points to show progress.")
             return
         
-        # Calculate progress metrics
-        first_entry = all_data.iloc[0]
-        latest_entry = all_data.iloc[-1]
-        
-        # Calculate changes
-        metrics = ['bmi', 'systolic_bp', 'diastolic_bp', 'glucose_fasting', 'total_cholesterol']
-        
-        col1, col2, col3, col4 = st.columns(4)
-        
-        with col1:
-            if 'bmi' in all_data.columns:
-                bmi_change = latest_entry['bmi'] - first_entry['bmi']
-                st.metric(
-                    "BMI Change", 
-                    f"{latest_entry['bmi']:.1f}",
-                    f"{bmi_change:+.1f}",
-                    delta_color="inverse" if bmi_change > 0 else "normal"
-                )
-        
-        with col2:
-            if 'systolic_bp' in all_data.columns:
-                bp_change = latest_entry['systolic_bp'] - first_entry['systolic_bp']
-                st.metric(
-                    "Systolic BP Change",
-                    f"{latest_entry['systolic_bp']:.0f}",
-                    f"{bp_change:+.0f}",
-                    delta_color="inverse" if bp_change > 0 else "normal"
-                )
-        
-        with col3:
-            if 'glucose_fasting' in all_data.columns:
-                glucose_change = latest_entry['glucose_fasting'] - first_entry['glucose_fasting']
-                st.metric(
-                    "Glucose Change",
-                    f"{latest_entry['glucose_fasting']:.0f}",
-                    f"{glucose_change:+.0f}",
-                    delta_color="inverse" if glucose_change > 0 else "normal"
-                )
-        
-        with col4:
-            if 'total_cholesterol' in all_data.columns:
-                chol_change = latest_entry['total_cholesterol'] - first_entry['total_cholesterol']
-                st.metric(
-                    "Cholesterol Change",
-                    f"{latest_entry['total_cholesterol']:.0f}",
-                    f"{chol_change:+.0f}",
-                    delta_color="inverse" if chol_change > 0 else "normal"
-                )
+        # Calculate progress metrics on plain dicts (one row read each, O(1) lookups)
+        first_entry = all_data.iloc[0].to_dict()
+        latest_entry = all_data.iloc[-1].to_dict()
+        
+        # Calculate changes for every overview metric at once
+        metrics = [metric for metric, _, _, _ in OVERVIEW_METRICS]
+        latest_values = np.array([latest_entry.get(metric, np.nan) for metric in metrics], dtype=float)
+        changes = latest_values - np.array([first_entry.get(metric, np.nan) for metric in metrics], dtype=float)
+        
+        for col, (metric, label, value_format, change_format), value, change in zip(
+            st.columns(4), OVERVIEW_METRICS, latest_values, changes
+        ):
+            if metric in latest_entry:
+                with col:
+                    st.metric(
+                        label,
+                        f"{value:{value_format}}",
+                        f"{change:{change_format}}",
+                        delta_color="inverse" if change > 0 else "normal"
+                    )
         
         # Progress timeline
         st.subheader("📅 Progress Timeline")
         
-        # Calculate health scores over time
-        health_scores = []
-        for _, row in all_data.iterrows():
-            score = self.data_processor.calculate_health_score(pd.DataFrame([row]))
-            health_scores.append(score)
+        # Calculate health scores over time (plotted directly, not added as a column)
+        health_scores = cached_health_scores(self.data_processor, self.health_data_manager.revision, all_data)
         
-        all_data['health_score'] = health_scores
-        
-        fig = px.line(
-            all_data, 
-            x='date', 
-            y='health_score',
-            title='Health Score Over Time',
-            labels={'health_score': 'Health Score', 'date': 'Date'},
-            markers=True
-        )
+        import plotly.graph_objects as go
+        from utils.visualization import plotly_dates
+        fig = go.Figure(go.Scatter(x=plotly_dates(all_data['date']), y=health_scores, mode='lines+markers'))
         
         fig.update_layout(
+            title='Health Score Over Time',
+            xaxis_title='Date',
+            xaxis_type='date',
+            yaxis_title='Health Score',
             yaxis_range=[0, 100],
             showlegend=False
         )
@@ -124,11 +123,8 @@ class ProgressTracker:
         st.subheader("📊 Detailed Progress Charts")
         
         # Metric selection
-        available_metrics = ['bmi', 'systolic_bp', 'diastolic_bp', 'glucose_fasting', 
-                           'total_cholesterol', 'hdl_cholesterol', 'triglycerides', 
-                           'exercise_minutes_per_week', 'sleep_hours', 'stress_level']
-        
-        available_metrics = [m for m in available_metrics if m in all_data.columns]
+        columns = set(all_data.columns)
+        available_metrics = [m for m in DETAIL_METRICS if m in columns]
         
         selected_metrics = st.multiselect(
             "Select metrics to display:",
@@ -149,34 +145,63 @@ class ProgressTracker:
         # Filter data based on time range
         filtered_data = self._filter_data_by_time(all_data, time_range)
         
-        # Create subplots
-        for metric in selected_metrics:
-            fig = px.line(
-                filtered_data,
-                x='date',
-                y=metric,
-                title=f'{metric.replace("_", " ").title()} Over Time',
-                markers=True
+        # Create one figure with a row per metric (a single chart to serialize and mount)
+        import plotly.graph_objects as go
+        from plotly.subplots import make_subplots
+        from utils.visualization import plotly_dates
+        dates = plotly_dates(filtered_data['date'])
+        fig = make_subplots(
+            rows=len(selected_metrics), cols=1,
+            subplot_titles=[f'{METRIC_TITLES[metric]} Over Time' for metric in selected_metrics],
+            shared_xaxes=True
+        )
+        
+        # Target bands are collected and applied in a single layout update
+        shapes = []
+        annotations = []
+        
+        for i, metric in enumerate(selected_metrics):
+            row = i + 1
+            fig.add_trace(
+                go.Scatter(
+                    x=dates,
+                    y=filtered_data[metric].to_numpy(),
+                    mode='lines+markers',
+                    name=METRIC_TITLES[metric]
+                ),
+                row=row, col=1
             )
             
-            # Add target ranges
-            target_ranges = self._get_target_ranges()
-            if metric in target_ranges:
-                target_min, target_max = target_ranges[metric]
-                fig.add_hline(y=target_min, line_dash="dash", line_color="green", 
-                            annotation_text=f"Target Min: {target_min}")
-                fig.add_hline(y=target_max, line_dash="dash", line_color="red", 
-                            annotation_text=f"Target Max: {target_max}")
-            
-            st.plotly_chart(fig, use_container_width=True)
+            # Shade the target range across the row's full width
+            if metric in TARGET_RANGES:
+                target_min, target_max = TARGET_RANGES[metric]
+                axis = str(row) if row > 1 else ''
+                shapes.append(dict(
+                    type='rect', xref=f'x{axis} domain', yref=f'y{axis}', x0=0, x1=1, y0=target_min, y1=target_max,
+                    fillcolor='green', opacity=0.1, line_width=0, layer='below'
+                ))
+                annotations.append(dict(
+                    xref=f'x{axis} domain', yref=f'y{axis}', x=1, y=target_max, xanchor='right', yanchor='top',
+                    text=TARGET_LABELS[metric], showarrow=False
+                ))
+        
+        fig.update_layout(
+            height=300 * len(selected_metrics),
+            showlegend=False,
+            shapes=shapes,
+            annotations=[*fig.layout.annotations, *annotations]  # keep the subplot titles
+        )
+        fig.update_xaxes(type='date')
+        
+        st.plotly_chart(fig, use_container_width=True)
     
-    def _display_goal_tracking(self, all_data):
+    def _display_goal_tracking(self, all_data, today):
         """Display goal tracking"""
         st.subheader("🎯 Goal Tracking")
         
         # Goal setting interface
         with st.expander("Set New Goals", expanded=False):
-            self._render_goal_setting_interface()
+            self._render_goal_setting_interface(today)
         
         # Display current goals
         goals = self.health_data_manager.get_user_goals()
@@ -185,11 +210,12 @@ class ProgressTracker:
             st.info("No goals set yet. Set some goals to track your progress!")
             return
         
-        # Display goal progress
+        # Display goal progress against the latest entry (read once for all goals)
+        latest = all_data.iloc[-1].to_dict()
         for goal in goals:
-            self._display_goal_progress(goal, all_data)
+            self._display_goal_progress(goal, latest, today)
     
-    def _render_goal_setting_interface(self):
+    def _render_goal_setting_interface(self, today):
         """Render goal setting interface"""
         st.write("**Set Your Health Goals**")
         
@@ -201,7 +227,7 @@ class ProgressTracker:
         if goal_type == "Weight Loss":
             current_weight = st.number_input("Current Weight (kg)", min_value=30, max_value=300, value=70)
             target_weight = st.number_input("Target Weight (kg)", min_value=30, max_value=300, value=65)
-            target_date = st.date_input("Target Date", value=datetime.now().date() + timedelta(days=90))
+            target_date = st.date_input("Target Date", value=today + timedelta(days=90))
             
             if st.button("Set Weight Loss Goal"):
                 goal = {
@@ -217,7 +243,7 @@ class ProgressTracker:
         elif goal_type == "Blood Pressure":
             target_systolic = st.number_input("Target Systolic BP (mmHg)", min_value=90, max_value=140, value=120)
             target_diastolic = st.number_input("Target Diastolic BP (mmHg)", min_value=60, max_value=90, value=80)
-            target_date = st.date_input("Target Date", value=datetime.now().date() + timedelta(days=60))
+            target_date = st.date_input("Target Date", value=today + timedelta(days=60))
             
             if st.button("Set Blood Pressure Goal"):
                 goal = {
@@ -232,12 +258,12 @@ class ProgressTracker:
         
         # Add more goal types as needed
     
-    def _display_goal_progress(self, goal, all_data):
+    def _display_goal_progress(self, goal, latest, today):
         """Display progress for a specific goal"""
         with st.expander(f"Goal: {goal['type'].replace('_', ' ').title()}", expanded=True):
             
             if goal['type'] == 'weight_loss':
-                current_weight = all_data.iloc[-1].get('weight', 0)
+                current_weight = latest.get('weight', 0)
                 target_weight = goal['target_value']
                 
                 progress = (goal['current_value'] - current_weight) / (goal['current_value'] - target_weight) * 100
@@ -253,13 +279,13 @@ class ProgressTracker:
                 st.progress(progress / 100)
                 st.write(f"Progress: {progress:.1f}%")
                 
-                # Days remaining
-                days_remaining = (goal['target_date'] - datetime.now().date()).days
+                # Days remaining (goals loaded from storage carry the date as a string)
+                days_remaining = (pd.Timestamp(goal['target_date']).date() - today).days
                 st.write(f"Days remaining: {days_remaining}")
             
             elif goal['type'] == 'blood_pressure':
-                current_systolic = all_data.iloc[-1].get('systolic_bp', 0)
-                current_diastolic = all_data.iloc[-1].get('diastolic_bp', 0)
+                current_systolic = latest.get('systolic_bp', 0)
+                current_diastolic = latest.get('diastolic_bp', 0)
                 
                 st.metric(
                     "Current BP",
@@ -291,16 +317,22 @@ class ProgressTracker:
                 start_date = intervention.get('start_date', datetime.now())
                 duration = intervention.get('duration', 'Ongoing')
                 
-                st.write(f"**Start Date:** {start_date.strftime('%Y-%m-%d')}")
-                st.write(f"**Duration:** {duration}")
+                # Stored interventions carry the start date as a string
+                lines = [
+                    f"**Start Date:** {pd.Timestamp(start_date).strftime('%Y-%m-%d')}",
+                    f"**Duration:** {duration}"
+                ]
                 
                 # Weekly goals progress
                 if 'weekly_goals' in intervention:
-                    st.write("**Weekly Goals Progress:**")
+                    lines.append("**Weekly Goals Progress:**")
                     
                     for goal in intervention['weekly_goals']:
                         status = "✅" if goal['completed'] else "⏳"
-                        st.write(f"{status} Week {goal['week']}: {goal['goal']}")
+                        lines.append(f"{status} Week {goal['week']}: {goal['goal']}")
+                
+                # One markdown block instead of a separate element per line
+                st.markdown("\n\n".join(lines))
                 
                 # Progress tracking
                 if st.button(f"Update Progress: {intervention['title']}", key=f"update_{intervention['title']}"):
@@ -349,13 +381,18 @@ class ProgressTracker:
             return
         
         # Calculate trends
-        trends = self.data_processor.detect_trends(all_data)
+        trends = cached_trends(self.data_processor, self.health_data_manager.revision, all_data)
         
         insights = []
         
+        # Split trends of metrics where lower is better in a single pass
+        buckets = {'decreasing': [], 'increasing': []}
+        for metric, trend in trends.items():
+            if metric in LOWER_IS_BETTER:
+                buckets[trend['direction']].append(metric)
+        
         # Positive trends
-        improving_metrics = [metric for metric, trend in trends.items() 
-                           if trend['direction'] == 'decreasing' and metric in ['bmi', 'systolic_bp', 'diastolic_bp', 'glucose_fasting']]
+        improving_metrics = buckets['decreasing']
         
         if improving_metrics:
             insights.append({
@@ -366,8 +403,7 @@ class ProgressTracker:
             })
         
         # Concerning trends
-        worsening_metrics = [metric for metric, trend in trends.items() 
-                           if trend['direction'] == 'increasing' and metric in ['bmi', 'systolic_bp', 'diastolic_bp', 'glucose_fasting']]
+        worsening_metrics = buckets['increasing']
         
         if worsening_metrics:
             insights.append({
@@ -404,16 +440,5 @@ class ProgressTracker:
         else:
             return data
         
-        return data[data['date'] >= start_date]
-    
-    def _get_target_ranges(self):
-        """Get target ranges for different metrics"""
-        return {
-            'bmi': (18.5, 24.9),
-            'systolic_bp': (90, 120),
-            'diastolic_bp': (60, 80),
-            'glucose_fasting': (70, 100),
-            'total_cholesterol': (150, 200),
-            'hdl_cholesterol': (40, 100),
-            'triglycerides': (50, 150)
-        }
+        # Entries are kept sorted by date, so the range is a binary-searched tail slice
+        return data.iloc[data['date'].searchsorted(start_date):]
@@ -3,29 +3,98 @@ import numpy as np
 from datetime import datetime, timedelta
 import json
 import os
+import copy
+import threading
+
+# Compact storage dtypes. Integer columns are only narrowed when every value is
+# present and whole; measured floats (bmi, weight, hba1c) stay float64 so saved
+# and displayed values don't pick up float32 rounding noise
+HEALTH_DTYPES = {
+    'age': 'int16', 'height': 'int16', 'waist_circumference': 'int16',
+    'systolic_bp': 'int16', 'diastolic_bp': 'int16', 'resting_heart_rate': 'int16',
+    'glucose_fasting': 'int16', 'total_cholesterol': 'int16', 'hdl_cholesterol': 'int16',
+    'ldl_cholesterol': 'int16', 'triglycerides': 'int16', 'exercise_minutes_per_week': 'int16',
+    'sleep_hours': 'int8', 'stress_level': 'int8', 'smoking_status': 'int8',
+    'alcohol_consumption': 'int8', 'diet_quality': 'int8',
+    'gender': 'category'
+}
+
+def _apply_dtypes(df):
+    """Cast health data columns to their compact dtypes where the values allow it"""
+    for col, dtype in HEALTH_DTYPES.items():
+        if col not in df.columns:
+            continue
+        if dtype == 'category':
+            df[col] = df[col].astype('category')
+            continue
+        values = pd.to_numeric(df[col], errors='coerce')
+        limits = np.iinfo(dtype)
+        if values.notna().all() and (values % 1 == 0).all() and values.between(limits.min, limits.max).all():
+            df[col] = values.astype(dtype)
+    return df
+
+def _json_default(value):
+    """Serialize the dates and NumPy scalars json can't encode itself"""
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _write_json(path, data):
+    """Write JSON through a temporary file swapped in with os.replace, so a
+    failed or interrupted save never leaves a truncated file behind"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2, default=_json_default)
+    os.replace(tmp_path, path)
 
 class HealthDataManager:
     def __init__(self):
-        self.data_file = 'health_data.json'
+        self.data_file = 'health_data.feather'
+        self.legacy_data_file = 'health_data.json'
         self.goals_file = 'user_goals.json'
         self.interventions_file = 'active_interventions.json'
         
+        # One manager is shared by every session thread, so each change (and the save
+        # that follows it) runs under this lock
+        self._lock = threading.Lock()
+        
+        # Bumped on every change to health_data so callers can key caches on it
+        self.revision = 0
+        self._statistics = (None, None)  # (revision, stats) of the last get_health_statistics
+        
         # Initialize data storage
         self.health_data = self._load_health_data()
         self.user_goals = self._load_user_goals()
         self.active_interventions = self._load_active_interventions()
+        
+        # Position of each tracked intervention by title (first one wins, as
+        # titles are not unique if an intervention is tracked twice)
+        self._intervention_index = {}
+        for i, intervention in enumerate(self.active_interventions):
+            self._intervention_index.setdefault(intervention['title'], i)
     
     def _load_health_data(self):
         """Load health data from storage"""
+        # Feather keeps the column dtypes, so no conversion is needed
         if os.path.exists(self.data_file):
             try:
-                with open(self.data_file, 'r') as f:
+                return pd.read_feather(self.data_file)
+            except:
+                return pd.DataFrame()
+        
+        # Fall back to the JSON file used by earlier versions (and the example data)
+        if os.path.exists(self.legacy_data_file):
+            try:
+                with open(self.legacy_data_file, 'r') as f:
                     data = json.load(f)
                     # Convert to DataFrame
                     if data:
                         df = pd.DataFrame(data)
-                        df['date'] = pd.to_datetime(df['date'])
-                        return df
+                        # Dates were written with isoformat(), so skip format inference
+                        df['date'] = pd.to_datetime(df['date'], format='ISO8601')
+                        return _apply_dtypes(df.sort_values('date', kind='stable').reset_index(drop=True))
                     else:
                         return pd.DataFrame()
             except:
@@ -55,19 +124,10 @@ class HealthDataManager:
     def _save_health_data(self):
         """Save health data to storage"""
         try:
-            # Convert DataFrame to JSON-serializable format
-            data_dict = self.health_data.to_dict('records')
-            
-            # Convert datetime objects to strings
-            for record in data_dict:
-                for key, value in record.items():
-                    if isinstance(value, (pd.Timestamp, datetime)):
-                        record[key] = value.isoformat()
-                    elif pd.isna(value):
-                        record[key] = None
-            
-            with open(self.data_file, 'w') as f:
-                json.dump(data_dict, f, indent=2)
+            # Written to a temporary file first so a failed save keeps the old data
+            tmp_file = f"{self.data_file}.tmp"
+            self.health_data.to_feather(tmp_file)
+            os.replace(tmp_file, self.data_file)
             return True
         except Exception as e:
             print(f"Error saving health data: {e}")
@@ -76,19 +136,7 @@ class HealthDataManager:
     def _save_user_goals(self):
         """Save user goals to storage"""
         try:
-            # Convert date objects to strings
-            goals_copy = []
-            for goal in self.user_goals:
-                goal_copy = goal.copy()
-                for key, value in goal_copy.items():
-                    if isinstance(value, (datetime, pd.Timestamp)):
-                        goal_copy[key] = value.isoformat()
-                    elif hasattr(value, 'isoformat'):
-                        goal_copy[key] = value.isoformat()
-                goals_copy.append(goal_copy)
-            
-            with open(self.goals_file, 'w') as f:
-                json.dump(goals_copy, f, indent=2)
+            _write_json(self.goals_file, self.user_goals)
             return True
         except Exception as e:
             print(f"Error saving user goals: {e}")
@@ -97,19 +145,7 @@ class HealthDataManager:
     def _save_active_interventions(self):
         """Save active interventions to storage"""
         try:
-            # Convert datetime objects to strings
-            interventions_copy = []
-            for intervention in self.active_interventions:
-                intervention_copy = intervention.copy()
-                for key, value in intervention_copy.items():
-                    if isinstance(value, (datetime, pd.Timestamp)):
-                        intervention_copy[key] = value.isoformat()
-                    elif hasattr(value, 'isoformat'):
-                        intervention_copy[key] = value.isoformat()
-                interventions_copy.append(intervention_copy)
-            
-            with open(self.interventions_file, 'w') as f:
-                json.dump(interventions_copy, f, indent=2)
+            _write_json(self.interventions_file, self.active_interventions)
             return True
         except Exception as e:
             print(f"Error saving active interventions: {e}")
@@ -118,36 +154,39 @@ class HealthDataManager:
     def add_health_data(self, data):
         """Add new health data entry"""
         try:
-            # Ensure data is a dictionary
-            if not isinstance(data, dict):
-                return False
-            
-            # Add timestamp if not present
-            if 'date' not in data:
-                data['date'] = datetime.now()
-            
-            # Convert to DataFrame row
-            new_row = pd.DataFrame([data])
-            
-            # Append to existing data
-            if self.health_data.empty:
-                self.health_data = new_row
-            else:
-                self.health_data = pd.concat([self.health_data, new_row], ignore_index=True)
-            
-            # Sort by date
-            self.health_data = self.health_data.sort_values('date').reset_index(drop=True)
+            with self._lock:
+                # Ensure data is a dictionary
+                if not isinstance(data, dict):
+                    return False
+                
+                # Add timestamp if not present, and store dates from the form
+                # (datetime.date) as Timestamps so they sort with loaded rows
+                data['date'] = pd.Timestamp(data.get('date', datetime.now()))
+                
+                # Merge the row in right away: the save below rewrites the whole Feather
+                # file, so persisting an entry is O(N) per insert either way
+                new_row = pd.DataFrame([data])
+                frame = new_row if self.health_data.empty else pd.concat([self.health_data, new_row], ignore_index=True)
+                
+                # New entries usually come after the latest stored date, so only sort when they don't
+                if not frame['date'].is_monotonic_increasing:
+                    frame = frame.sort_values('date', kind='stable').reset_index(drop=True)
+                self.health_data = _apply_dtypes(frame)
+                self.revision += 1
+                
+                # Save to storage
+                return self._save_health_data()
             
-            # Save to storage
-            return self._save_health_data()
-        
         except Exception as e:
             print(f"Error adding health data: {e}")
             return False
     
     def get_all_data(self):
         """Get all health data"""
-        return self.health_data.copy()
+        # A shallow copy: callers get their own frame (new columns stay local) without
+        # duplicating the data on every rerun; pandas 3 copy-on-write keeps later in-place
+        # edits (update_health_data's .at) from reaching frames handed out earlier
+        return self.health_data.copy(deep=False)
     
     def get_latest_data(self):
         """Get latest health data entry"""
@@ -172,16 +211,35 @@ class HealthDataManager:
     def update_health_data(self, index, data):
         """Update existing health data entry"""
         try:
-            if index < 0 or index >= len(self.health_data):
-                return False
-            
-            # Update the row
-            for key, value in data.items():
-                self.health_data.at[index, key] = value
+            with self._lock:
+                if index < 0 or index >= len(self.health_data):
+                    return False
+                
+                # Edit a copy and swap it in at the end, so readers never see a
+                # half-updated frame
+                frame = self.health_data.copy(deep=False)
+                
+                # Update the row, widening compact integer and category columns so any
+                # value fits (_apply_dtypes narrows them again below)
+                for key, value in data.items():
+                    if key in frame.columns:
+                        dtype = frame[key].dtype
+                        if dtype.kind in 'iu':
+                            frame[key] = frame[key].astype('float64')
+                        elif isinstance(dtype, pd.CategoricalDtype):
+                            frame[key] = frame[key].astype(object)
+                    frame.at[index, key] = value
+                _apply_dtypes(frame)
+                
+                # Keep entries in date order (time-range filters binary search on it)
+                if 'date' in data:
+                    frame = frame.sort_values('date', kind='stable').reset_index(drop=True)
+                self.health_data = frame
+                self.revision += 1
+                
+                # Save to storage
+                return self._save_health_data()
             
-            # Save to storage
-            return self._save_health_data()
-        
         except Exception as e:
             print(f"Error updating health data: {e}")
             return False
@@ -189,15 +247,17 @@ class HealthDataManager:
     def delete_health_data(self, index):
         """Delete health data entry"""
         try:
-            if index < 0 or index >= len(self.health_data):
-                return False
-            
-            # Drop the row
-            self.health_data = self.health_data.drop(index).reset_index(drop=True)
+            with self._lock:
+                if index < 0 or index >= len(self.health_data):
+                    return False
+                
+                # Drop the row; the remaining values may fit the compact dtypes again
+                self.health_data = _apply_dtypes(self.health_data.drop(index).reset_index(drop=True))
+                self.revision += 1
+                
+                # Save to storage
+                return self._save_health_data()
             
-            # Save to storage
-            return self._save_health_data()
-        
         except Exception as e:
             print(f"Error deleting health data: {e}")
             return False
@@ -205,33 +265,37 @@ class HealthDataManager:
     def add_user_goal(self, goal):
         """Add new user goal"""
         try:
-            # Add creation timestamp
-            goal['created_at'] = datetime.now()
-            goal['status'] = 'active'
+            with self._lock:
+                # Add creation timestamp
+                goal['created_at'] = datetime.now()
+                goal['status'] = 'active'
+                
+                self.user_goals.append(goal)
+                return self._save_user_goals()
             
-            self.user_goals.append(goal)
-            return self._save_user_goals()
-        
         except Exception as e:
             print(f"Error adding user goal: {e}")
             return False
     
     def get_user_goals(self):
         """Get all user goals"""
-        return self.user_goals.copy()
+        # Deep copies, so a session editing them can't change the shared entries
+        # without going through the locked update methods
+        return copy.deepcopy(self.user_goals)
     
     def update_user_goal(self, goal_id, updates):
         """Update existing user goal"""
         try:
-            if goal_id < 0 or goal_id >= len(self.user_goals):
-                return False
-            
-            # Update the goal
-            for key, value in updates.items():
-                self.user_goals[goal_id][key] = value
+            with self._lock:
+                if goal_id < 0 or goal_id >= len(self.user_goals):
+                    return False
+                
+                # Update the goal
+                for key, value in updates.items():
+                    self.user_goals[goal_id][key] = value
+                
+                return self._save_user_goals()
             
-            return self._save_user_goals()
-        
         except Exception as e:
             print(f"Error updating user goal: {e}")
             return False
@@ -239,34 +303,43 @@ class HealthDataManager:
     def add_intervention_tracking(self, intervention):
         """Add intervention to tracking"""
         try:
-            # Add tracking metadata
-            intervention['start_date'] = datetime.now()
-            intervention['status'] = 'active'
-            intervention['overall_progress'] = 0
-            intervention['notes'] = ''
+            with self._lock:
+                # Flatten personalized overlays into a plain dict for storage, with
+                # tracking metadata added in the same step
+                intervention = {
+                    **intervention,
+                    'start_date': datetime.now(),
+                    'status': 'active',
+                    'overall_progress': 0,
+                    'notes': ''
+                }
+                
+                self._intervention_index.setdefault(intervention['title'], len(self.active_interventions))
+                self.active_interventions.append(intervention)
+                return self._save_active_interventions()
             
-            self.active_interventions.append(intervention)
-            return self._save_active_interventions()
-        
         except Exception as e:
             print(f"Error adding intervention tracking: {e}")
             return False
     
     def get_active_interventions(self):
         """Get all active interventions"""
-        return self.active_interventions.copy()
+        # Deep copies, so a session editing them can't change the shared entries
+        # without going through the locked update methods
+        return copy.deepcopy(self.active_interventions)
     
     def update_intervention_progress(self, intervention):
         """Update intervention progress"""
         try:
-            # Find and update the intervention
-            for i, active_intervention in enumerate(self.active_interventions):
-                if active_intervention['title'] == intervention['title']:
-                    self.active_interventions[i] = intervention
-                    return self._save_active_interventions()
+            with self._lock:
+                # Find and update the intervention
+                i = self._intervention_index.get(intervention['title'])
+                if i is None:
+                    return False
+                
+                self.active_interventions[i] = intervention
+                return self._save_active_interventions()
             
-            return False
-        
         except Exception as e:
             print(f"Error updating intervention progress: {e}")
             return False
@@ -276,41 +349,32 @@ class HealthDataManager:
         if self.health_data.empty:
             return {}
         
-        stats = {}
+        # Reuse the statistics until the data changes; callers get their own copy
+        revision, stats = self._statistics
+        if revision == self.revision:
+            return copy.deepcopy(stats)
         
-        # Calculate basic statistics for numeric columns
-        numeric_columns = self.health_data.select_dtypes(include=[np.number]).columns
+        # Calculate basic statistics for all numeric columns in one aggregation
+        numeric = self.health_data.select_dtypes(include=[np.number])
+        summary = numeric.agg(['mean', 'median', 'std', 'min', 'max'])
+        summary.loc['latest'] = numeric.iloc[-1]
+        stats = summary.to_dict()
         
-        for col in numeric_columns:
-            stats[col] = {
-                'mean': self.health_data[col].mean(),
-                'median': self.health_data[col].median(),
-                'std': self.health_data[col].std(),
-                'min': self.health_data[col].min(),
-                'max': self.health_data[col].max(),
-                'latest': self.health_data[col].iloc[-1] if not self.health_data.empty else None
+        # Add trend information, comparing column means of the first and last entries
+        if len(numeric) >= 2:
+            recent_mean = numeric.tail(5).mean()
+            historical_mean = numeric.head(5).mean() if len(numeric) >= 10 else numeric.mean()
+            
+            direction = np.where(recent_mean > historical_mean, "increasing", "decreasing")
+            magnitude = ((recent_mean - historical_mean).abs() / historical_mean * 100).where(historical_mean != 0, 0)
+            
+            stats['trends'] = {
+                col: {'direction': trend, 'magnitude': change}
+                for col, trend, change in zip(numeric.columns, direction, magnitude)
             }
         
-        # Add trend information
-        if len(self.health_data) >= 2:
-            stats['trends'] = {}
-            for col in numeric_columns:
-                recent_values = self.health_data[col].tail(5)
-                historical_values = self.health_data[col].head(5) if len(self.health_data) >= 10 else self.health_data[col]
-                
-                if len(recent_values) > 0 and len(historical_values) > 0:
-                    recent_mean = recent_values.mean()
-                    historical_mean = historical_values.mean()
-                    
-                    trend = "increasing" if recent_mean > historical_mean else "decreasing"
-                    magnitude = abs(recent_mean - historical_mean) / historical_mean * 100 if historical_mean != 0 else 0
-                    
-                    stats['trends'][col] = {
-                        'direction': trend,
-                        'magnitude': magnitude
-                    }
-        
-        return stats
+        self._statistics = (self.revision, stats)
+        return copy.deepcopy(stats)
     
     def export_data(self, format='csv'):
         """Export health data"""
@@ -331,31 +395,42 @@ class HealthDataManager:
     def import_data(self, data, format='csv'):
         """Import health data"""
         try:
-            if format == 'csv':
-                # Assume data is CSV string
-                from io import StringIO
-                df = pd.read_csv(StringIO(data))
-            elif format == 'json':
-                # Assume data is JSON string
-                df = pd.read_json(data, orient='records')
-            else:
-                return False
-            
-            # Validate and clean data
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'])
-            
-            # Append to existing data
-            if self.health_data.empty:
-                self.health_data = df
-            else:
-                self.health_data = pd.concat([self.health_data, df], ignore_index=True)
-            
-            # Remove duplicates and sort
-            self.health_data = self.health_data.drop_duplicates().sort_values('date').reset_index(drop=True)
+            with self._lock:
+                if format == 'csv':
+                    # Assume data is CSV string; pyarrow's reader is multithreaded and
+                    # already parses ISO dates
+                    from io import BytesIO
+                    df = pd.read_csv(BytesIO(data.encode()), engine='pyarrow')
+                elif format == 'json':
+                    # Assume data is JSON string
+                    df = pd.read_json(data, orient='records')
+                else:
+                    return False
+                
+                # Validate and clean data
+                if 'date' in df.columns:
+                    df['date'] = pd.to_datetime(df['date'])
+                
+                # Reject rows outside the accepted health ranges
+                from models.data_processor import DataProcessor
+                invalid = DataProcessor().validate_batch(df)
+                if invalid:
+                    for row, errors in invalid.items():
+                        print(f"Skipping imported row {row}: {'; '.join(errors)}")
+                    df = df.drop(index=list(invalid))
+                
+                # Append to existing data
+                if self.health_data.empty:
+                    self.health_data = df
+                else:
+                    self.health_data = pd.concat([self.health_data, df], ignore_index=True)
+                
+                # Remove duplicates, sort and store with the compact dtypes
+                self.health_data = _apply_dtypes(self.health_data.drop_duplicates().sort_values('date', kind='stable').reset_index(drop=True))
+                self.revision += 1
+                
+                return self._save_health_data()
             
-            return self._save_health_data()
-        
         except Exception as e:
             print(f"Error importing data: {e}")
             return False
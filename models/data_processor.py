@@ -5,6 +5,38 @@ from sklearn.preprocessing import StandardScaler
 import warnings
 warnings.filterwarnings('ignore')
 
+# Accepted ranges for entered health data: (column, min, max, error message)
+VALIDATION_RULES = (
+    ('age', 1, 150, "Age must be between 1 and 150 years"),
+    ('bmi', 10, 60, "BMI must be between 10 and 60"),
+    ('systolic_bp', 70, 250, "Systolic blood pressure must be between 70 and 250 mmHg"),
+    ('diastolic_bp', 40, 150, "Diastolic blood pressure must be between 40 and 150 mmHg"),
+    ('glucose_fasting', 50, 400, "Fasting glucose must be between 50 and 400 mg/dL"),
+    ('total_cholesterol', 100, 500, "Total cholesterol must be between 100 and 500 mg/dL")
+)
+VALIDATION_COLUMNS = [column for column, _, _, _ in VALIDATION_RULES]
+VALIDATION_LOW = np.array([low for _, low, _, _ in VALIDATION_RULES])
+VALIDATION_HIGH = np.array([high for _, _, high, _ in VALIDATION_RULES])
+
+# Defaults for health metrics missing from cleaned data
+CLEAN_DEFAULTS = {
+    'age': 40,
+    'bmi': 25,
+    'systolic_bp': 120,
+    'diastolic_bp': 80,
+    'glucose_fasting': 90,
+    'total_cholesterol': 200,
+    'hdl_cholesterol': 50,
+    'ldl_cholesterol': 100,
+    'triglycerides': 150,
+    'waist_circumference': 80,
+    'exercise_minutes_per_week': 150,
+    'sleep_hours': 7,
+    'stress_level': 5,
+    'smoking_status': 0,
+    'alcohol_consumption': 0
+}
+
 class DataProcessor:
     def __init__(self):
         self.scaler = StandardScaler()
@@ -20,26 +52,25 @@ class DataProcessor:
         errors = []
         
         # Check required fields
-        if 'age' not in data or data['age'] <= 0 or data['age'] > 150:
-            errors.append("Age must be between 1 and 150 years")
-        
-        if 'bmi' not in data or data['bmi'] < 10 or data['bmi'] > 60:
-            errors.append("BMI must be between 10 and 60")
-        
-        if 'systolic_bp' not in data or data['systolic_bp'] < 70 or data['systolic_bp'] > 250:
-            errors.append("Systolic blood pressure must be between 70 and 250 mmHg")
-        
-        if 'diastolic_bp' not in data or data['diastolic_bp'] < 40 or data['diastolic_bp'] > 150:
-            errors.append("Diastolic blood pressure must be between 40 and 150 mmHg")
-        
-        if 'glucose_fasting' not in data or data['glucose_fasting'] < 50 or data['glucose_fasting'] > 400:
-            errors.append("Fasting glucose must be between 50 and 400 mg/dL")
-        
-        if 'total_cholesterol' not in data or data['total_cholesterol'] < 100 or data['total_cholesterol'] > 500:
-            errors.append("Total cholesterol must be between 100 and 500 mg/dL")
+        for column, low, high, message in VALIDATION_RULES:
+            if column not in data or data[column] < low or data[column] > high:
+                errors.append(message)
         
         return errors
     
+    def validate_batch(self, data):
+        """Validate every record of a health data frame at once, returning the
+        errors of each invalid row keyed by its index label"""
+        # Missing columns read as NaN but fail for every row
+        values = data.reindex(columns=VALIDATION_COLUMNS).to_numpy(dtype=float, na_value=np.nan)
+        missing = ~np.isin(VALIDATION_COLUMNS, data.columns)
+        invalid = (values < VALIDATION_LOW) | (values > VALIDATION_HIGH) | missing
+        
+        errors = {}
+        for row, rule in np.argwhere(invalid):
+            errors.setdefault(data.index[row], []).append(VALIDATION_RULES[rule][3])
+        return errors
+    
     def clean_data(self, data):
         """Clean and preprocess health data"""
         if isinstance(data, dict):
@@ -52,86 +83,67 @@ class DataProcessor:
         # Convert date to datetime
         data['date'] = pd.to_datetime(data['date'])
         
-        # Fill missing values with defaults
-        defaults = {
-            'age': 40,
-            'bmi': 25,
-            'systolic_bp': 120,
-            'diastolic_bp': 80,
-            'glucose_fasting': 90,
-            'total_cholesterol': 200,
-            'hdl_cholesterol': 50,
-            'ldl_cholesterol': 100,
-            'triglycerides': 150,
-            'waist_circumference': 80,
-            'exercise_minutes_per_week': 150,
-            'sleep_hours': 7,
-            'stress_level': 5,
-            'smoking_status': 0,
-            'alcohol_consumption': 0
-        }
-        
-        for col, default_val in defaults.items():
-            if col not in data.columns:
-                data[col] = default_val
-            else:
-                data[col] = data[col].fillna(default_val)
-        
-        return data
+        # Add missing columns and fill missing values with defaults in one pass
+        return data.reindex(columns=data.columns.union(list(CLEAN_DEFAULTS), sort=False)).fillna(CLEAN_DEFAULTS)
     
     def calculate_derived_metrics(self, data):
         """Calculate derived health metrics"""
         if data.empty:
             return data
         
-        # Calculate pulse pressure
-        data['pulse_pressure'] = data['systolic_bp'] - data['diastolic_bp']
-        
-        # Calculate cholesterol ratios
-        data['total_hdl_ratio'] = data['total_cholesterol'] / data['hdl_cholesterol']
-        data['ldl_hdl_ratio'] = data['ldl_cholesterol'] / data['hdl_cholesterol']
-        
-        # Calculate cardiovascular risk score (simplified)
-        data['cv_risk_score'] = (
-            (data['age'] * 0.1) +
-            (data['bmi'] * 0.2) +
-            (data['systolic_bp'] * 0.05) +
-            (data['total_cholesterol'] * 0.01) +
-            (data['smoking_status'] * 10)
+        # Read each input column once as an array
+        systolic = data['systolic_bp'].to_numpy(dtype=float)
+        diastolic = data['diastolic_bp'].to_numpy(dtype=float)
+        total_chol = data['total_cholesterol'].to_numpy(dtype=float)
+        hdl_chol = data['hdl_cholesterol'].to_numpy(dtype=float)
+        ldl_chol = data['ldl_cholesterol'].to_numpy(dtype=float)
+        
+        # Cholesterol ratios are undefined (NaN) for a zero HDL reading
+        nonzero_hdl = hdl_chol != 0
+        
+        # Add all derived columns in a single assign
+        return data.assign(
+            # Pulse pressure
+            pulse_pressure=systolic - diastolic,
+            # Cholesterol ratios
+            total_hdl_ratio=np.divide(total_chol, hdl_chol, out=np.full(len(data), np.nan), where=nonzero_hdl),
+            ldl_hdl_ratio=np.divide(ldl_chol, hdl_chol, out=np.full(len(data), np.nan), where=nonzero_hdl),
+            # Cardiovascular risk score (simplified)
+            cv_risk_score=(
+                (data['age'].to_numpy(dtype=float) * 0.1) +
+                (data['bmi'].to_numpy(dtype=float) * 0.2) +
+                (systolic * 0.05) +
+                (total_chol * 0.01) +
+                (data['smoking_status'].to_numpy(dtype=float) * 10)
+            )
         )
-        
-        return data
     
     def detect_trends(self, data, window=30):
         """Detect trends in health metrics"""
         if data.empty or len(data) < 2:
             return {}
         
-        # Sort by date
-        data = data.sort_values('date')
+        # Sort by date (stored data is already in date order)
+        if not data['date'].is_monotonic_increasing:
+            data = data.sort_values('date')
         
-        trends = {}
         metrics = ['bmi', 'systolic_bp', 'diastolic_bp', 'glucose_fasting', 'total_cholesterol']
-        
-        for metric in metrics:
-            if metric in data.columns:
-                # Calculate rolling mean
-                data[f'{metric}_trend'] = data[metric].rolling(window=min(window, len(data))).mean()
-                
-                # Calculate trend direction
-                if len(data) >= 2:
-                    recent_avg = data[metric].tail(5).mean()
-                    historical_avg = data[metric].head(5).mean() if len(data) >= 10 else data[metric].mean()
-                    
-                    trend_direction = "increasing" if recent_avg > historical_avg else "decreasing"
-                    trend_magnitude = abs(recent_avg - historical_avg) / historical_avg * 100
-                    
-                    trends[metric] = {
-                        'direction': trend_direction,
-                        'magnitude': trend_magnitude,
-                        'recent_avg': recent_avg,
-                        'historical_avg': historical_avg
-                    }
+        values = data[[metric for metric in metrics if metric in data.columns]]
+        
+        # Compare recent and historical averages of all metrics at once
+        recent_avg = values.tail(5).mean()
+        historical_avg = values.head(5).mean() if len(data) >= 10 else values.mean()
+        trend_magnitude = (recent_avg - historical_avg).abs() / historical_avg * 100
+        
+        trends = {
+            metric: {
+                'direction': "increasing" if recent_avg[metric] > historical_avg[metric] else "decreasing",
+                'magnitude': trend_magnitude[metric],
+                'recent_avg': recent_avg[metric],
+                'historical_avg': historical_avg[metric]
+            }
+            for metric in values.columns
+        }
         
         return trends
     
@@ -200,6 +212,50 @@ class DataProcessor:
         
         return max(0, min(100, score))
     
+    def calculate_health_scores(self, data):
+        """Calculate the health score of every row at once (same rules as calculate_health_score)"""
+        if data.empty:
+            return np.zeros(0)
+        
+        def column(name, default):
+            # Missing columns score as the default; missing values match no rule
+            if name not in data.columns:
+                return np.full(len(data), default, dtype=float)
+            return data[name].to_numpy(dtype=float, na_value=np.nan)
+        
+        score = np.full(len(data), 100.0)  # Start with perfect score
+        
+        # BMI penalty
+        bmi = column('bmi', 25)
+        score -= np.select([bmi > 30, bmi > 25, bmi < 18.5], [20, 10, 15], 0)
+        
+        # Blood pressure penalty
+        systolic = column('systolic_bp', 120)
+        diastolic = column('diastolic_bp', 80)
+        score -= np.select([(systolic > 140) | (diastolic > 90), (systolic > 130) | (diastolic > 80)], [25, 15], 0)
+        
+        # Glucose penalty
+        glucose = column('glucose_fasting', 90)
+        score -= np.select([glucose > 126, glucose > 100], [30, 15], 0)
+        
+        # Cholesterol penalty
+        score -= np.where(column('total_cholesterol', 200) > 240, 15, 0)
+        score -= np.where(column('hdl_cholesterol', 50) < 40, 10, 0)
+        
+        # Lifestyle bonuses/penalties
+        exercise = column('exercise_minutes_per_week', 150)
+        score += np.select([exercise >= 150, exercise < 75], [5, -10], 0)
+        
+        sleep = column('sleep_hours', 7)
+        score += np.select([(sleep >= 7) & (sleep <= 8), (sleep < 6) | (sleep > 9)], [5, -10], 0)
+        
+        stress = column('stress_level', 5)
+        score += np.select([stress <= 3, stress >= 8], [5, -15], 0)
+        
+        score -= np.where(column('smoking_status', 0) == 1, 20, 0)
+        
+        return np.clip(score, 0, 100)
+    
     def get_health_insights(self, data):
         """Generate health insights from data"""
         if data.empty:
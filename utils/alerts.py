@@ -1,11 +1,29 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
+from datetime import timedelta
 
 class AlertSystem:
     def __init__(self):
         self.alert_thresholds = self._define_alert_thresholds()
         self.trend_thresholds = self._define_trend_thresholds()
+        
+        # Flatten the value thresholds into aligned arrays so one comparison checks
+        # them all; '_low' thresholds alert at or below the threshold (sign -1)
+        rules = [
+            (severity, metric, threshold)
+            for severity, thresholds in self.alert_thresholds.items()
+            for metric, threshold in thresholds.items()
+        ]
+        self._value_severities = [severity for severity, _, _ in rules]
+        self._value_metrics = [metric for _, metric, _ in rules]
+        self._value_thresholds = np.array([threshold for _, _, threshold in rules], dtype=float)
+        self._value_signs = np.array([-1.0 if metric.endswith('_low') else 1.0 for metric in self._value_metrics])
+        
+        # Display titles for alert messages, built once ('_low' keys read as the metric)
+        self._metric_titles = {
+            metric: metric.replace("_", " ").replace(" low", "").title()
+            for metric in [*self._value_metrics, *self.trend_thresholds['rapid_increase']]
+        }
     
     def _define_alert_thresholds(self):
         """Define alert thresholds for various health metrics"""
@@ -64,14 +82,17 @@ class AlertSystem:
         if health_data.empty:
             return alerts
         
+        # Latest measurement date, shared by the trend and pattern checks
+        last_date = health_data['date'].max()
+        
         # Check value-based alerts
         alerts.extend(self._check_value_alerts(health_data))
         
         # Check trend-based alerts
-        alerts.extend(self._check_trend_alerts(health_data))
+        alerts.extend(self._check_trend_alerts(health_data, last_date))
         
         # Check pattern-based alerts
-        alerts.extend(self._check_pattern_alerts(health_data))
+        alerts.extend(self._check_pattern_alerts(health_data, last_date, pd.Timestamp.now()))
         
         # Check medication adherence alerts
         alerts.extend(self._check_adherence_alerts(health_data))
@@ -84,96 +105,88 @@ class AlertSystem:
     
     def _check_value_alerts(self, health_data):
         """Check for alerts based on current values"""
-        alerts = []
-        latest_data = health_data.iloc[-1]
+        # A plain dict lookup is far cheaper than Series label indexing; threshold
+        # keys that aren't data columns come back NaN and never fire
+        latest_data = dict(zip(health_data.columns, health_data.iloc[-1].to_numpy()))
+        values = [latest_data.get(metric, np.nan) for metric in self._value_metrics]
+        numeric = np.array([np.nan if value is None else value for value in values], dtype=float)
+        fired = self._value_signs * numeric >= self._value_signs * self._value_thresholds
         
-        # Critical alerts
-        for metric, threshold in self.alert_thresholds['critical'].items():
-            if metric in latest_data:
-                value = latest_data[metric]
-                if pd.notna(value) and value >= threshold:
-                    alerts.append({
-                        'severity': 'Critical',
-                        'message': f'{metric.replace("_", " ").title()} is critically high: {value}',
-                        'recommendation': 'Seek immediate medical attention',
-                        'metric': metric,
-                        'value': value,
-                        'threshold': threshold
-                    })
+        return [
+            self._value_alert(self._value_severities[i], self._value_metrics[i], values[i])
+            for i in np.flatnonzero(fired)
+        ]
+    
+    def _value_alert(self, severity, metric, value):
+        """Build the alert for a value that crossed its threshold"""
+        threshold = self.alert_thresholds[severity][metric]
         
-        # Warning alerts
-        for metric, threshold in self.alert_thresholds['warning'].items():
-            if metric in latest_data:
-                value = latest_data[metric]
-                if pd.notna(value):
-                    if metric == 'hdl_cholesterol_low':
-                        if value <= threshold:
-                            alerts.append({
-                                'severity': 'Warning',
-                                'message': f'HDL cholesterol is low: {value} mg/dL',
-                                'recommendation': 'Consider lifestyle changes to increase HDL',
-                                'metric': 'hdl_cholesterol',
-                                'value': value,
-                                'threshold': threshold
-                            })
-                    elif value >= threshold:
-                        alerts.append({
-                            'severity': 'Warning',
-                            'message': f'{metric.replace("_", " ").title()} is elevated: {value}',
-                            'recommendation': 'Monitor closely and consider intervention',
-                            'metric': metric,
-                            'value': value,
-                            'threshold': threshold
-                        })
-        
-        # Info alerts
-        for metric, threshold in self.alert_thresholds['info'].items():
-            if metric in latest_data:
-                value = latest_data[metric]
-                if pd.notna(value):
-                    if metric in ['exercise_minutes_per_week_low', 'sleep_hours_low']:
-                        if value <= threshold:
-                            alerts.append({
-                                'severity': 'Info',
-                                'message': f'{metric.replace("_", " ").replace(" low", "").title()} is below recommended: {value}',
-                                'recommendation': 'Consider increasing to meet recommended levels',
-                                'metric': metric.replace('_low', ''),
-                                'value': value,
-                                'threshold': threshold
-                            })
-                    elif metric == 'sleep_hours_high':
-                        if value >= threshold:
-                            alerts.append({
-                                'severity': 'Info',
-                                'message': f'Sleep hours are above recommended: {value}',
-                                'recommendation': 'Excessive sleep may indicate underlying health issues',
-                                'metric': 'sleep_hours',
-                                'value': value,
-                                'threshold': threshold
-                            })
-                    elif metric == 'stress_level_high':
-                        if value >= threshold:
-                            alerts.append({
-                                'severity': 'Info',
-                                'message': f'Stress level is high: {value}/10',
-                                'recommendation': 'Consider stress management techniques',
-                                'metric': 'stress_level',
-                                'value': value,
-                                'threshold': threshold
-                            })
-                    elif value >= threshold:
-                        alerts.append({
-                            'severity': 'Info',
-                            'message': f'{metric.replace("_", " ").title()} is above optimal: {value}',
-                            'recommendation': 'Consider lifestyle modifications',
-                            'metric': metric,
-                            'value': value,
-                            'threshold': threshold
-                        })
+        if severity == 'critical':
+            return {
+                'severity': 'Critical',
+                'message': f'{self._metric_titles[metric]} is critically high: {value}',
+                'recommendation': 'Seek immediate medical attention',
+                'metric': metric,
+                'value': value,
+                'threshold': threshold
+            }
         
-        return alerts
+        if severity == 'warning':
+            if metric == 'hdl_cholesterol_low':
+                return {
+                    'severity': 'Warning',
+                    'message': f'HDL cholesterol is low: {value} mg/dL',
+                    'recommendation': 'Consider lifestyle changes to increase HDL',
+                    'metric': 'hdl_cholesterol',
+                    'value': value,
+                    'threshold': threshold
+                }
+            return {
+                'severity': 'Warning',
+                'message': f'{self._metric_titles[metric]} is elevated: {value}',
+                'recommendation': 'Monitor closely and consider intervention',
+                'metric': metric,
+                'value': value,
+                'threshold': threshold
+            }
+        
+        if metric in ['exercise_minutes_per_week_low', 'sleep_hours_low']:
+            return {
+                'severity': 'Info',
+                'message': f'{self._metric_titles[metric]} is below recommended: {value}',
+                'recommendation': 'Consider increasing to meet recommended levels',
+                'metric': metric.replace('_low', ''),
+                'value': value,
+                'threshold': threshold
+            }
+        elif metric == 'sleep_hours_high':
+            return {
+                'severity': 'Info',
+                'message': f'Sleep hours are above recommended: {value}',
+                'recommendation': 'Excessive sleep may indicate underlying health issues',
+                'metric': 'sleep_hours',
+                'value': value,
+                'threshold': threshold
+            }
+        elif metric == 'stress_level_high':
+            return {
+                'severity': 'Info',
+                'message': f'Stress level is high: {value}/10',
+                'recommendation': 'Consider stress management techniques',
+                'metric': 'stress_level',
+                'value': value,
+                'threshold': threshold
+            }
+        return {
+            'severity': 'Info',
+            'message': f'{self._metric_titles[metric]} is above optimal: {value}',
+            'recommendation': 'Consider lifestyle modifications',
+            'metric': metric,
+            'value': value,
+            'threshold': threshold
+        }
     
-    def _check_trend_alerts(self, health_data):
+    def _check_trend_alerts(self, health_data, last_date):
         """Check for alerts based on trends"""
         alerts = []
         
@@ -181,30 +194,39 @@ class AlertSystem:
             return alerts
         
         # Check for rapid increases
-        for metric, threshold in self.trend_thresholds['rapid_increase'].items():
-            if metric in health_data.columns:
-                # Get data from last 30 days
-                cutoff_date = health_data['date'].max() - timedelta(days=30)
-                recent_data = health_data[health_data['date'] > cutoff_date]
-                
-                if len(recent_data) >= 2:
-                    value_change = recent_data[metric].iloc[-1] - recent_data[metric].iloc[0]
-                    
-                    if value_change >= threshold:
-                        alerts.append({
-                            'severity': 'Warning',
-                            'message': f'{metric.replace("_", " ").title()} has increased rapidly: +{value_change:.1f} in 30 days',
-                            'recommendation': 'Monitor closely and consider medical evaluation',
-                            'metric': metric,
-                            'change': value_change,
-                            'threshold': threshold
-                        })
+        metrics = [metric for metric in self.trend_thresholds['rapid_increase'] if metric in health_data.columns]
+        thresholds = [self.trend_thresholds['rapid_increase'][metric] for metric in metrics]
+        
+        # Get data from last 30 days once, then all metrics' changes from its
+        # first and last rows
+        cutoff_date = last_date - timedelta(days=30)
+        recent_mask = (health_data['date'] > cutoff_date).to_numpy()
+        
+        if metrics and recent_mask.sum() >= 2:
+            recent_positions = np.flatnonzero(recent_mask)[[0, -1]]
+            # Per-column arrays; building a sub-frame costs several times more
+            first, last = np.array([
+                health_data[metric].to_numpy(dtype=float, na_value=np.nan)[recent_positions] for metric in metrics
+            ]).T
+            value_changes = last - first
+            
+            for i in np.flatnonzero(value_changes >= np.array(thresholds)):
+                metric, threshold, value_change = metrics[i], thresholds[i], value_changes[i]
+                alerts.append({
+                    'severity': 'Warning',
+                    'message': f'{self._metric_titles[metric]} has increased rapidly: +{value_change:.1f} in 30 days',
+                    'recommendation': 'Monitor closely and consider medical evaluation',
+                    'metric': metric,
+                    'change': value_change,
+                    'threshold': threshold
+                })
         
         # Check for concerning declining trends
-        exercise_data = health_data[health_data['exercise_minutes_per_week'].notna()]
-        if len(exercise_data) >= 2:
-            recent_exercise = exercise_data['exercise_minutes_per_week'].tail(5).mean()
-            historical_exercise = exercise_data['exercise_minutes_per_week'].head(5).mean()
+        exercise = health_data['exercise_minutes_per_week'].to_numpy(dtype=float, na_value=np.nan)
+        exercise = exercise[~np.isnan(exercise)]
+        if len(exercise) >= 2:
+            recent_exercise = exercise[-5:].mean()
+            historical_exercise = exercise[:5].mean()
             
             if historical_exercise > 0 and recent_exercise / historical_exercise < 0.5:
                 alerts.append({
@@ -217,13 +239,12 @@ class AlertSystem:
         
         return alerts
     
-    def _check_pattern_alerts(self, health_data):
+    def _check_pattern_alerts(self, health_data, last_date, now):
         """Check for alerts based on patterns"""
         alerts = []
         
         # Check for missed measurements
-        last_measurement = health_data['date'].max()
-        days_since_last = (datetime.now() - last_measurement).days
+        days_since_last = (now - last_date).days
         
         if days_since_last > 30:
             alerts.append({
@@ -234,14 +255,12 @@ class AlertSystem:
                 'days_since_last': days_since_last
             })
         
-        # Check for inconsistent measurement patterns
-        measurement_gaps = []
-        for i in range(1, len(health_data)):
-            gap = (health_data['date'].iloc[i] - health_data['date'].iloc[i-1]).days
-            measurement_gaps.append(gap)
+        # Check for inconsistent measurement patterns (gaps in whole days, floored
+        # like Timedelta.days)
+        measurement_gaps = np.diff(health_data['date'].to_numpy('datetime64[ns]')) // np.timedelta64(1, 'D')
         
-        if measurement_gaps:
-            avg_gap = np.mean(measurement_gaps)
+        if measurement_gaps.size:
+            avg_gap = measurement_gaps.mean()
             if avg_gap > 14:  # Average gap > 2 weeks
                 alerts.append({
                     'severity': 'Info',
@@ -253,7 +272,9 @@ class AlertSystem:
         
         # Check for missing key metrics
         required_metrics = ['systolic_bp', 'diastolic_bp', 'glucose_fasting', 'bmi']
-        missing_metrics = [metric for metric in required_metrics if metric not in health_data.columns or health_data[metric].isna().all()]
+        present_metrics = [metric for metric in required_metrics if metric in health_data.columns]
+        all_missing = health_data[present_metrics].isna().all()
+        missing_metrics = [metric for metric in required_metrics if metric not in all_missing or all_missing[metric]]
         
         if missing_metrics:
             alerts.append({
@@ -275,10 +296,13 @@ class AlertSystem:
         
         # Check for erratic measurement patterns (might indicate poor adherence)
         if len(health_data) >= 5:
-            bp_measurements = health_data[['systolic_bp', 'diastolic_bp']].dropna()
-            if len(bp_measurements) >= 5:
+            # Systolic readings from entries with both BP values recorded
+            systolic = health_data['systolic_bp'].to_numpy(dtype=float, na_value=np.nan)
+            diastolic = health_data['diastolic_bp'].to_numpy(dtype=float, na_value=np.nan)
+            systolic = systolic[~np.isnan(systolic) & ~np.isnan(diastolic)]
+            if len(systolic) >= 5:
                 # Check for high variability (coefficient of variation > 0.2)
-                systolic_cv = bp_measurements['systolic_bp'].std() / bp_measurements['systolic_bp'].mean()
+                systolic_cv = systolic.std(ddof=1) / systolic.mean()
                 
                 if systolic_cv > 0.2:
                     alerts.append({
@@ -0,0 +1,73 @@
+import streamlit as st
+import pandas as pd
+
+def _frame_key(data):
+    """Cheap stable key for a health data frame: its shape and latest row"""
+    if data.empty:
+        return (0,)
+    return (data.shape, tuple(data.columns), tuple(map(str, data.iloc[-1])))
+
+# Hashing whole DataFrames on every rerun is slow, so key frames on shape + latest row
+_HASH_FUNCS = {pd.DataFrame: _frame_key}
+
+@st.cache_data(hash_funcs=_HASH_FUNCS, show_spinner=False)
+def cached_risk_scores(_risk_model, health_data):
+    """Cached RiskAssessmentModel.calculate_risk_scores"""
+    return _risk_model.calculate_risk_scores(health_data)
+
+@st.cache_data(hash_funcs=_HASH_FUNCS, show_spinner=False)
+def cached_risk_factors(_risk_model, health_data):
+    """Cached RiskAssessmentModel.analyze_risk_factors"""
+    return _risk_model.analyze_risk_factors(health_data)
+
+@st.cache_data(hash_funcs=_HASH_FUNCS, show_spinner=False)
+def cached_detailed_analysis(_risk_model, condition, health_data):
+    """Cached RiskAssessmentModel.get_detailed_analysis"""
+    return _risk_model.get_detailed_analysis(condition, health_data)
+
+@st.cache_data(hash_funcs=_HASH_FUNCS, show_spinner=False)
+def cached_health_score(_data_processor, health_data):
+    """Cached DataProcessor.calculate_health_score"""
+    return _data_processor.calculate_health_score(health_data)
+
+# Score timelines and trends read every row, and edits to older entries keep the
+# latest row unchanged, so these are keyed on the data manager's revision instead
+@st.cache_data(show_spinner=False)
+def cached_health_scores(_data_processor, revision, _health_data):
+    """Cached DataProcessor.calculate_health_scores"""
+    return _data_processor.calculate_health_scores(_health_data)
+
+@st.cache_data(show_spinner=False)
+def cached_trends(_data_processor, revision, _health_data):
+    """Cached DataProcessor.detect_trends"""
+    return _data_processor.detect_trends(_health_data)
+
+@st.cache_data(hash_funcs=_HASH_FUNCS, show_spinner=False)
+def cached_health_insights(_data_processor, health_data):
+    """Cached DataProcessor.get_health_insights"""
+    return _data_processor.get_health_insights(health_data)
+
+@st.cache_data(hash_funcs=_HASH_FUNCS, show_spinner=False)
+def cached_interventions(_intervention_engine, latest_data, risk_scores):
+    """Cached InterventionEngine.get_interventions"""
+    return _intervention_engine.get_interventions(latest_data, risk_scores)
+
+# Alerts read the whole history (trends, gaps, variability), so they are keyed on the
+# revision too; they also depend on the current date (days since last measurement),
+# so expire hourly
+@st.cache_data(show_spinner=False, ttl=3600)
+def cached_alerts(_alert_system, revision, _health_data):
+    """Cached AlertSystem.check_alerts"""
+    return _alert_system.check_alerts(_health_data)
+
+# Figures are only read by st.plotly_chart (which converts them to a fresh dict), so
+# cache the Figure objects themselves instead of pickling copies like cache_data does
+@st.cache_resource(show_spinner=False, max_entries=64)
+def cached_risk_factors_radar(_viz_utils, risk_factors):
+    """Cached VisualizationUtils.create_risk_factors_radar"""
+    return _viz_utils.create_risk_factors_radar(risk_factors)
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def cached_biomarker_gauges(_viz_utils, biomarkers):
+    """Cached VisualizationUtils.create_biomarker_gauges"""
+    return _viz_utils.create_biomarker_gauges(biomarkers)
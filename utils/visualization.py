@@ -1,10 +1,115 @@
-import plotly.express as px
 import plotly.graph_objects as go
-from plotly.subplots import make_subplots
+from plotly.colors import qualitative
 import pandas as pd
 import numpy as np
+import json
+from functools import lru_cache
+from itertools import cycle
 from datetime import datetime, timedelta
 
+# Risk level lookup (a score equal to a threshold stays in the lower level)
+RISK_THRESH = np.array([0.4, 0.7])
+RISK_LEVELS = ('Low', 'Medium', 'High')
+RISK_COLORS = ('🟢', '🟡', '🔴')
+
+# Traces with at least this many points render with WebGL instead of SVG
+WEBGL_MIN_POINTS = 1000
+
+# Points kept per chart trace, and the min/max preselection factor for long series
+CHART_MAX_POINTS = 2000
+MINMAX_RATIO = 4
+
+def risk_label(score):
+    """Risk level and color dot for a risk score"""
+    i = int(np.searchsorted(RISK_THRESH, score, side='left'))
+    return RISK_LEVELS[i], RISK_COLORS[i]
+
+def plotly_dates(dates):
+    """Dates as epoch milliseconds for a date-typed axis, which Plotly sends as one
+    base64 block instead of an ISO string per point"""
+    ms = pd.to_datetime(dates).to_numpy('datetime64[ms]')
+    # Missing dates stay NaN (a gap) rather than the int64 NaT sentinel
+    return np.where(np.isnat(ms), np.nan, ms.astype(np.int64))
+
+def _scatter_cls(n):
+    """Scatter trace class for n points, WebGL for long series"""
+    return go.Scattergl if n >= WEBGL_MIN_POINTS else go.Scatter
+
+def _scatter_type(n):
+    """Scatter trace type name for n points, for plain dict traces"""
+    return 'scattergl' if n >= WEBGL_MIN_POINTS else 'scatter'
+
+def _pairwise_corr(values):
+    """Pearson correlation matrix of a 2-D float array over pairwise-complete rows
+    (like DataFrame.corr), built from masked matrix products"""
+    present = ~np.isnan(values)
+    
+    # Shift each column by its first value so constant columns center to exactly 0
+    first = values[present.argmax(axis=0), np.arange(values.shape[1])]
+    centered = np.where(present, values - first, 0.0)
+    mask = present.astype(float)
+    
+    # Per-pair counts, sums and sums of squares over the rows both columns share
+    n = mask.T @ mask
+    sums = centered.T @ mask
+    squares = (centered * centered).T @ mask
+    
+    with np.errstate(invalid='ignore', divide='ignore'):
+        cov = centered.T @ centered - sums * sums.T / n
+        var = squares - sums * sums / n
+        corr = cov / np.sqrt(var * var.T)
+    return np.clip(corr, -1, 1)
+
+@lru_cache(maxsize=None)
+def _lifestyle_layout_json():
+    """Lifestyle chart layout, a fixed 2x2 subplot grid, serialized once since
+    make_subplots costs more than the rest of the chart"""
+    from plotly.subplots import make_subplots
+    layout = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=('Exercise Minutes/Week', 'Sleep Hours/Night', 'Stress Level', 'Weight'),
+        specs=[[{"secondary_y": False}, {"secondary_y": False}],
+               [{"secondary_y": False}, {"secondary_y": False}]]
+    ).layout.to_plotly_json()
+    layout.update(title=dict(text="Lifestyle Metrics Overview"), height=600, showlegend=False)
+    for axis in ('xaxis', 'xaxis2', 'xaxis3', 'xaxis4'):
+        layout[axis]['type'] = 'date'
+    return json.dumps(layout)
+
+def _reference_lines(lines):
+    """Shapes and annotations for dashed horizontal (y, color, label) lines, as add_hline draws them"""
+    shapes = [
+        dict(type='line', xref='x domain', x0=0, x1=1, yref='y', y0=y, y1=y, line=dict(color=color, dash='dash'))
+        for y, color, label in lines
+    ]
+    annotations = [
+        dict(text=label, showarrow=False, xref='x domain', x=1, xanchor='right', yref='y', y=y, yanchor='bottom')
+        for y, color, label in lines
+    ]
+    return shapes, annotations
+
+def _reference_bands(bands):
+    """Shapes and annotations for shaded (y0, y1, color, label) bands, as add_hrect draws them
+    with a top-left label"""
+    shapes = [
+        dict(type='rect', xref='x domain', x0=0, x1=1, yref='y', y0=y0, y1=y1, fillcolor=color, opacity=0.2)
+        for y0, y1, color, label in bands
+    ]
+    annotations = [
+        dict(text=label, showarrow=False, xref='x domain', x=0, xanchor='left', yref='y', y=y1, yanchor='top')
+        for y0, y1, color, label in bands
+    ]
+    return shapes, annotations
+
+def _trusted_figure(data, layout):
+    """Figure from plain trace and layout dicts, skipping Plotly's per-property
+    validation (Streamlit doesn't re-validate Figure objects either)"""
+    return go.Figure(data=data, layout=layout, _validate=False)
+
+def _empty_figure():
+    """Blank figure for charts with no data (a new one per call, since callers may update it)"""
+    return _trusted_figure([], {})
+
 class VisualizationUtils:
     def __init__(self):
         # Define color schemes for different health metrics
@@ -24,13 +129,15 @@ class VisualizationUtils:
                 'improving': '#00CC96',
                 'stable': '#636EFA',
                 'declining': '#EF553B'
-            }
+            },
+            # Qualitative cycle for multi-series and categorical charts
+            'series': tuple(qualitative.Set3)
         }
     
     def create_risk_factors_radar(self, risk_factors):
         """Create a radar chart for risk factors"""
         if not risk_factors:
-            return go.Figure()
+            return _empty_figure()
         
         # Prepare data for radar chart
         categories = list(risk_factors.keys())
@@ -68,8 +175,8 @@ class VisualizationUtils:
         
         return fig
     
-    def create_biomarker_gauge(self, biomarker_name, biomarker_data):
-        """Create a gauge chart for biomarker values"""
+    def create_biomarker_gauge(self, biomarker_name, biomarker_data, fig=None, row=None, col=None):
+        """Create a gauge chart for biomarker values, or add it to a subplot of fig"""
         value = biomarker_data['value']
         normal_range = biomarker_data['normal_range']
         unit = biomarker_data['unit']
@@ -86,10 +193,9 @@ class VisualizationUtils:
         else:
             color = self.color_schemes['health_metrics']['fair']
         
-        fig = go.Figure(go.Indicator(
+        indicator = go.Indicator(
             mode="gauge+number+delta",
             value=value,
-            domain={'x': [0, 1], 'y': [0, 1]},
             title={'text': f"{biomarker_name} ({unit})" if unit else biomarker_name},
             delta={'reference': (normal_range[0] + normal_range[1]) / 2},
             gauge={
@@ -106,7 +212,15 @@ class VisualizationUtils:
                     'value': normal_range[1]
                 }
             }
-        ))
+        )
+        
+        # Add to an existing subplot grid
+        if fig is not None:
+            fig.add_trace(indicator, row=row, col=col)
+            return fig
+        
+        indicator.domain = {'x': [0, 1], 'y': [0, 1]}
+        fig = go.Figure(indicator)
         
         fig.update_layout(
             height=300,
@@ -115,36 +229,140 @@ class VisualizationUtils:
         
         return fig
     
+    def create_biomarker_gauges(self, biomarkers, cols=2):
+        """Create a single figure with a gauge for each biomarker"""
+        from plotly.subplots import make_subplots
+        rows = -(-len(biomarkers) // cols)
+        
+        fig = make_subplots(
+            rows=rows, cols=cols,
+            specs=[[{'type': 'indicator'}] * cols] * rows,
+            vertical_spacing=0.1
+        )
+        
+        for i, (biomarker, data) in enumerate(biomarkers.items()):
+            self.create_biomarker_gauge(biomarker, data, fig=fig, row=(i // cols) + 1, col=(i % cols) + 1)
+        
+        fig.update_layout(
+            height=300 * rows,
+            margin=dict(l=20, r=20, t=40, b=20)
+        )
+        
+        return fig
+    
+    def downsample_lttb(self, x, y, max_points=1000):
+        """Downsample a series to max_points using MinMaxLTTB (Largest-Triangle-Three-Buckets
+        over a min/max preselection)"""
+        x = np.asarray(x)
+        y = np.asarray(y)
+        n = len(y)
+        
+        if n <= max_points or max_points < 3:
+            return x, y
+        
+        # Work on numeric copies (dates as integer timestamps, NaN treated as 0)
+        x_num = x.view('int64').astype(float) if np.issubdtype(x.dtype, np.datetime64) else x.astype(float)
+        y_num = np.nan_to_num(y.astype(float))
+        
+        # Long series: keep only each bucket's min and max point before running LTTB
+        candidates = self._minmax_indices(y_num, max_points * MINMAX_RATIO // 2)
+        if candidates is not None:
+            x_num = x_num[candidates]
+            y_num = y_num[candidates]
+            n = len(candidates)
+        
+        # Always keep the first and last point, pick one point per inner bucket
+        edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+        selected = np.empty(max_points, dtype=np.int64)
+        selected[0] = 0
+        selected[-1] = n - 1
+        
+        # Average of each inner bucket, used as the third triangle point
+        counts = np.diff(edges)
+        avg_x = np.add.reduceat(x_num, edges[:-1]) / counts
+        avg_y = np.add.reduceat(y_num, edges[:-1]) / counts
+        
+        a = 0
+        for i in range(max_points - 2):
+            lo, hi = edges[i], edges[i + 1]
+            
+            # Average of the next bucket (or the last point for the final bucket)
+            if i + 2 < len(edges):
+                next_x, next_y = avg_x[i + 1], avg_y[i + 1]
+            else:
+                next_x, next_y = x_num[-1], y_num[-1]
+            
+            # Keep the point forming the largest triangle with the previous pick
+            area = np.abs(
+                (x_num[a] - next_x) * (y_num[lo:hi] - y_num[a]) -
+                (x_num[a] - x_num[lo:hi]) * (next_y - y_num[a])
+            )
+            a = lo + int(np.argmax(area))
+            selected[i + 1] = a
+        
+        if candidates is not None:
+            selected = candidates[selected]
+        
+        return x[selected], y[selected]
+    
+    def _minmax_indices(self, y, n_buckets):
+        """Sorted indices of the first, last and each bucket's min and max point,
+        or None if the series is too short to be worth reducing"""
+        inner = y[1:-1]
+        m = len(inner)
+        if m <= 2 * n_buckets:
+            return None
+        
+        # Equal-width buckets as rows of a padded matrix (padding never wins)
+        width = -(-m // n_buckets)
+        rows = -(-m // width)
+        pad = rows * width - m
+        lows = np.concatenate([inner, np.full(pad, np.inf)]).reshape(rows, width)
+        highs = np.concatenate([inner, np.full(pad, -np.inf)]).reshape(rows, width)
+        starts = np.arange(rows) * width + 1
+        
+        indices = np.concatenate([
+            [0],
+            starts + lows.argmin(axis=1),
+            starts + highs.argmax(axis=1),
+            [len(y) - 1]
+        ])
+        return np.unique(indices)
+    
     def create_health_trends_chart(self, data, metrics, title="Health Trends Over Time"):
         """Create a multi-line chart for health trends"""
         if data.empty or not metrics:
-            return go.Figure()
+            return _empty_figure()
         
         # Filter data for available metrics
         available_metrics = [m for m in metrics if m in data.columns]
         
         if not available_metrics:
-            return go.Figure()
+            return _empty_figure()
         
-        fig = go.Figure()
+        dates = plotly_dates(data['date'])
+        scatter_type = _scatter_type(len(dates))
         
         # Define colors for different metrics
-        colors = px.colors.qualitative.Set3
-        
-        for i, metric in enumerate(available_metrics):
-            fig.add_trace(go.Scatter(
-                x=data['date'],
-                y=data[metric],
+        colors = cycle(self.color_schemes['series'])
+        
+        traces = []
+        for metric, color in zip(available_metrics, colors):
+            x, y = self.downsample_lttb(dates, data[metric], CHART_MAX_POINTS)
+            traces.append(dict(
+                type=scatter_type,
+                x=x,
+                y=y,
                 mode='lines+markers',
                 name=metric.replace('_', ' ').title(),
-                line=dict(color=colors[i % len(colors)], width=2),
+                line=dict(color=color, width=2),
                 marker=dict(size=6)
             ))
         
-        fig.update_layout(
-            title=title,
-            xaxis_title="Date",
-            yaxis_title="Values",
+        return _trusted_figure(traces, dict(
+            title=dict(text=title),
+            xaxis=dict(title=dict(text="Date"), type='date'),
+            yaxis=dict(title=dict(text="Values")),
             hovermode='x unified',
             height=400,
             showlegend=True,
@@ -155,36 +373,21 @@ class VisualizationUtils:
                 xanchor="right",
                 x=1
             )
-        )
-        
-        return fig
+        ))
     
     def create_bmi_category_chart(self, bmi_history):
         """Create a chart showing BMI categories over time"""
         if bmi_history.empty:
-            return go.Figure()
-        
-        # Define BMI categories
-        def get_bmi_category(bmi):
-            if bmi < 18.5:
-                return 'Underweight'
-            elif bmi < 25:
-                return 'Normal'
-            elif bmi < 30:
-                return 'Overweight'
-            else:
-                return 'Obese'
-        
-        # Add BMI categories
-        bmi_history['bmi_category'] = bmi_history['bmi'].apply(get_bmi_category)
+            return _empty_figure()
         
         # Create the chart
         fig = go.Figure()
         
         # Add BMI line
-        fig.add_trace(go.Scatter(
-            x=bmi_history['date'],
-            y=bmi_history['bmi'],
+        x, y = self.downsample_lttb(plotly_dates(bmi_history['date']), bmi_history['bmi'], CHART_MAX_POINTS)
+        fig.add_trace(_scatter_cls(len(bmi_history))(
+            x=x,
+            y=y,
             mode='lines+markers',
             name='BMI',
             line=dict(color='blue', width=3),
@@ -192,18 +395,19 @@ class VisualizationUtils:
         ))
         
         # Add BMI category zones
-        fig.add_hrect(y0=0, y1=18.5, fillcolor="lightblue", opacity=0.2, 
-                     annotation_text="Underweight", annotation_position="top left")
-        fig.add_hrect(y0=18.5, y1=25, fillcolor="lightgreen", opacity=0.2, 
-                     annotation_text="Normal", annotation_position="top left")
-        fig.add_hrect(y0=25, y1=30, fillcolor="orange", opacity=0.2, 
-                     annotation_text="Overweight", annotation_position="top left")
-        fig.add_hrect(y0=30, y1=50, fillcolor="red", opacity=0.2, 
-                     annotation_text="Obese", annotation_position="top left")
+        shapes, annotations = _reference_bands([
+            (0, 18.5, "lightblue", "Underweight"),
+            (18.5, 25, "lightgreen", "Normal"),
+            (25, 30, "orange", "Overweight"),
+            (30, 50, "red", "Obese")
+        ])
         
         fig.update_layout(
             title="BMI Progress Over Time",
+            shapes=shapes,
+            annotations=annotations,
             xaxis_title="Date",
+            xaxis_type='date',
             yaxis_title="BMI",
             yaxis_range=[15, 45],
             height=400,
@@ -215,14 +419,17 @@ class VisualizationUtils:
     def create_blood_pressure_chart(self, bp_data):
         """Create a blood pressure chart with both systolic and diastolic"""
         if bp_data.empty:
-            return go.Figure()
+            return _empty_figure()
         
         fig = go.Figure()
+        dates = plotly_dates(bp_data['date'])
+        scatter_cls = _scatter_cls(len(dates))
         
         # Add systolic BP
-        fig.add_trace(go.Scatter(
-            x=bp_data['date'],
-            y=bp_data['systolic_bp'],
+        x, y = self.downsample_lttb(dates, bp_data['systolic_bp'], CHART_MAX_POINTS)
+        fig.add_trace(scatter_cls(
+            x=x,
+            y=y,
             mode='lines+markers',
             name='Systolic BP',
             line=dict(color='red', width=2),
@@ -230,9 +437,10 @@ class VisualizationUtils:
         ))
         
         # Add diastolic BP
-        fig.add_trace(go.Scatter(
-            x=bp_data['date'],
-            y=bp_data['diastolic_bp'],
+        x, y = self.downsample_lttb(dates, bp_data['diastolic_bp'], CHART_MAX_POINTS)
+        fig.add_trace(scatter_cls(
+            x=x,
+            y=y,
             mode='lines+markers',
             name='Diastolic BP',
             line=dict(color='blue', width=2),
@@ -240,21 +448,20 @@ class VisualizationUtils:
         ))
         
         # Add reference lines for BP categories
-        fig.add_hline(y=120, line_dash="dash", line_color="green", 
-                     annotation_text="Normal Systolic (<120)")
-        fig.add_hline(y=130, line_dash="dash", line_color="orange", 
-                     annotation_text="Elevated Systolic (130)")
-        fig.add_hline(y=140, line_dash="dash", line_color="red", 
-                     annotation_text="High Systolic (140+)")
-        
-        fig.add_hline(y=80, line_dash="dash", line_color="green", 
-                     annotation_text="Normal Diastolic (<80)")
-        fig.add_hline(y=90, line_dash="dash", line_color="red", 
-                     annotation_text="High Diastolic (90+)")
+        shapes, annotations = _reference_lines([
+            (120, "green", "Normal Systolic (<120)"),
+            (130, "orange", "Elevated Systolic (130)"),
+            (140, "red", "High Systolic (140+)"),
+            (80, "green", "Normal Diastolic (<80)"),
+            (90, "red", "High Diastolic (90+)")
+        ])
         
         fig.update_layout(
             title="Blood Pressure Trends",
+            shapes=shapes,
+            annotations=annotations,
             xaxis_title="Date",
+            xaxis_type='date',
             yaxis_title="Blood Pressure (mmHg)",
             height=400,
             showlegend=True
@@ -265,14 +472,15 @@ class VisualizationUtils:
     def create_glucose_chart(self, glucose_data):
         """Create a glucose levels chart"""
         if glucose_data.empty:
-            return go.Figure()
+            return _empty_figure()
         
         fig = go.Figure()
         
         # Add glucose line
-        fig.add_trace(go.Scatter(
-            x=glucose_data['date'],
-            y=glucose_data['glucose_fasting'],
+        x, y = self.downsample_lttb(plotly_dates(glucose_data['date']), glucose_data['glucose_fasting'], CHART_MAX_POINTS)
+        fig.add_trace(_scatter_cls(len(glucose_data))(
+            x=x,
+            y=y,
             mode='lines+markers',
             name='Fasting Glucose',
             line=dict(color='purple', width=2),
@@ -280,16 +488,18 @@ class VisualizationUtils:
         ))
         
         # Add reference zones
-        fig.add_hrect(y0=0, y1=100, fillcolor="lightgreen", opacity=0.2, 
-                     annotation_text="Normal (<100 mg/dL)", annotation_position="top left")
-        fig.add_hrect(y0=100, y1=126, fillcolor="orange", opacity=0.2, 
-                     annotation_text="Pre-diabetic (100-125 mg/dL)", annotation_position="top left")
-        fig.add_hrect(y0=126, y1=400, fillcolor="red", opacity=0.2, 
-                     annotation_text="Diabetic (≥126 mg/dL)", annotation_position="top left")
+        shapes, annotations = _reference_bands([
+            (0, 100, "lightgreen", "Normal (<100 mg/dL)"),
+            (100, 126, "orange", "Pre-diabetic (100-125 mg/dL)"),
+            (126, 400, "red", "Diabetic (≥126 mg/dL)")
+        ])
         
         fig.update_layout(
             title="Fasting Glucose Levels",
+            shapes=shapes,
+            annotations=annotations,
             xaxis_title="Date",
+            xaxis_type='date',
             yaxis_title="Glucose (mg/dL)",
             height=400,
             showlegend=False
@@ -300,19 +510,22 @@ class VisualizationUtils:
     def create_cholesterol_panel_chart(self, cholesterol_data):
         """Create a cholesterol panel chart"""
         if cholesterol_data.empty:
-            return go.Figure()
-        
-        fig = go.Figure()
+            return _empty_figure()
         
         # Add cholesterol traces
         cholesterol_metrics = ['total_cholesterol', 'hdl_cholesterol', 'ldl_cholesterol', 'triglycerides']
         colors = ['blue', 'green', 'red', 'orange']
+        dates = plotly_dates(cholesterol_data['date'])
+        scatter_type = _scatter_type(len(dates))
         
+        traces = []
         for i, metric in enumerate(cholesterol_metrics):
             if metric in cholesterol_data.columns:
-                fig.add_trace(go.Scatter(
-                    x=cholesterol_data['date'],
-                    y=cholesterol_data[metric],
+                x, y = self.downsample_lttb(dates, cholesterol_data[metric], CHART_MAX_POINTS)
+                traces.append(dict(
+                    type=scatter_type,
+                    x=x,
+                    y=y,
                     mode='lines+markers',
                     name=metric.replace('_', ' ').title(),
                     line=dict(color=colors[i], width=2),
@@ -320,117 +533,78 @@ class VisualizationUtils:
                 ))
         
         # Add reference lines
-        fig.add_hline(y=200, line_dash="dash", line_color="green", 
-                     annotation_text="Total Cholesterol Target (<200)")
-        fig.add_hline(y=40, line_dash="dash", line_color="red", 
-                     annotation_text="HDL Minimum (40+)")
-        fig.add_hline(y=100, line_dash="dash", line_color="orange", 
-                     annotation_text="LDL Target (<100)")
-        fig.add_hline(y=150, line_dash="dash", line_color="purple", 
-                     annotation_text="Triglycerides Target (<150)")
-        
-        fig.update_layout(
-            title="Cholesterol Panel Over Time",
-            xaxis_title="Date",
-            yaxis_title="Cholesterol (mg/dL)",
+        shapes, annotations = _reference_lines([
+            (200, "green", "Total Cholesterol Target (<200)"),
+            (40, "red", "HDL Minimum (40+)"),
+            (100, "orange", "LDL Target (<100)"),
+            (150, "purple", "Triglycerides Target (<150)")
+        ])
+        
+        return _trusted_figure(traces, dict(
+            title=dict(text="Cholesterol Panel Over Time"),
+            xaxis=dict(title=dict(text="Date"), type='date'),
+            yaxis=dict(title=dict(text="Cholesterol (mg/dL)")),
             height=400,
-            showlegend=True
-        )
-        
-        return fig
+            showlegend=True,
+            shapes=shapes,
+            annotations=annotations
+        ))
     
     def create_lifestyle_metrics_chart(self, lifestyle_data):
         """Create a chart for lifestyle metrics"""
         if lifestyle_data.empty:
-            return go.Figure()
-        
-        # Create subplots
-        fig = make_subplots(
-            rows=2, cols=2,
-            subplot_titles=('Exercise Minutes/Week', 'Sleep Hours/Night', 'Stress Level', 'Weight'),
-            specs=[[{"secondary_y": False}, {"secondary_y": False}],
-                   [{"secondary_y": False}, {"secondary_y": False}]]
-        )
-        
-        # Exercise
-        if 'exercise_minutes_per_week' in lifestyle_data.columns:
-            fig.add_trace(
-                go.Scatter(
-                    x=lifestyle_data['date'],
-                    y=lifestyle_data['exercise_minutes_per_week'],
-                    mode='lines+markers',
-                    name='Exercise',
-                    line=dict(color='blue')
-                ),
-                row=1, col=1
-            )
-        
-        # Sleep
-        if 'sleep_hours' in lifestyle_data.columns:
-            fig.add_trace(
-                go.Scatter(
-                    x=lifestyle_data['date'],
-                    y=lifestyle_data['sleep_hours'],
-                    mode='lines+markers',
-                    name='Sleep',
-                    line=dict(color='green')
-                ),
-                row=1, col=2
-            )
-        
-        # Stress
-        if 'stress_level' in lifestyle_data.columns:
-            fig.add_trace(
-                go.Scatter(
-                    x=lifestyle_data['date'],
-                    y=lifestyle_data['stress_level'],
-                    mode='lines+markers',
-                    name='Stress',
-                    line=dict(color='red')
-                ),
-                row=2, col=1
-            )
-        
-        # Weight
-        if 'weight' in lifestyle_data.columns:
-            fig.add_trace(
-                go.Scatter(
-                    x=lifestyle_data['date'],
-                    y=lifestyle_data['weight'],
+            return _empty_figure()
+        
+        # Subplot grid layout; traces reference its axes directly (x/y, x2/y2, ...)
+        layout = json.loads(_lifestyle_layout_json())
+        dates = plotly_dates(lifestyle_data['date'])
+        scatter_type = _scatter_type(len(dates))
+        
+        # Exercise, sleep, stress and weight, one subplot each
+        panels = [
+            ('exercise_minutes_per_week', 'Exercise', 'blue', ''),
+            ('sleep_hours', 'Sleep', 'green', '2'),
+            ('stress_level', 'Stress', 'red', '3'),
+            ('weight', 'Weight', 'orange', '4')
+        ]
+        traces = []
+        for metric, name, color, axis in panels:
+            if metric in lifestyle_data.columns:
+                x, y = self.downsample_lttb(dates, lifestyle_data[metric], CHART_MAX_POINTS)
+                traces.append(dict(
+                    type=scatter_type,
+                    x=x,
+                    y=y,
                     mode='lines+markers',
-                    name='Weight',
-                    line=dict(color='orange')
-                ),
-                row=2, col=2
-            )
-        
-        fig.update_layout(
-            title="Lifestyle Metrics Overview",
-            height=600,
-            showlegend=False
-        )
+                    name=name,
+                    line=dict(color=color),
+                    xaxis=f'x{axis}',
+                    yaxis=f'y{axis}'
+                ))
         
-        return fig
+        return _trusted_figure(traces, layout)
     
     def create_risk_score_evolution(self, risk_data):
         """Create a chart showing risk score evolution over time"""
         if not risk_data:
-            return go.Figure()
-        
-        # Convert risk data to DataFrame for easier handling
-        df = pd.DataFrame(risk_data)
+            return _empty_figure()
         
         fig = go.Figure()
         
-        # Add risk score traces
+        # Add risk score traces, read straight from the records (a condition
+        # missing from some records is NaN there)
         conditions = ['pre_diabetes', 'hypertension', 'metabolic_syndrome']
         colors = ['orange', 'red', 'purple']
+        dates = plotly_dates([record['date'] for record in risk_data])
+        scatter_cls = _scatter_cls(len(dates))
         
         for i, condition in enumerate(conditions):
-            if condition in df.columns:
-                fig.add_trace(go.Scatter(
-                    x=df['date'],
-                    y=df[condition] * 100,  # Convert to percentage
+            if any(condition in record for record in risk_data):
+                scores = np.array([record.get(condition) for record in risk_data], dtype=float)
+                x, y = self.downsample_lttb(dates, scores * 100, CHART_MAX_POINTS)  # Convert to percentage
+                fig.add_trace(scatter_cls(
+                    x=x,
+                    y=y,
                     mode='lines+markers',
                     name=condition.replace('_', ' ').title(),
                     line=dict(color=colors[i], width=2),
@@ -438,16 +612,18 @@ class VisualizationUtils:
                 ))
         
         # Add risk level zones
-        fig.add_hrect(y0=0, y1=40, fillcolor="lightgreen", opacity=0.2, 
-                     annotation_text="Low Risk (<40%)", annotation_position="top left")
-        fig.add_hrect(y0=40, y1=70, fillcolor="orange", opacity=0.2, 
-                     annotation_text="Medium Risk (40-70%)", annotation_position="top left")
-        fig.add_hrect(y0=70, y1=100, fillcolor="red", opacity=0.2, 
-                     annotation_text="High Risk (>70%)", annotation_position="top left")
+        shapes, annotations = _reference_bands([
+            (0, 40, "lightgreen", "Low Risk (<40%)"),
+            (40, 70, "orange", "Medium Risk (40-70%)"),
+            (70, 100, "red", "High Risk (>70%)")
+        ])
         
         fig.update_layout(
             title="Risk Score Evolution Over Time",
+            shapes=shapes,
+            annotations=annotations,
             xaxis_title="Date",
+            xaxis_type='date',
             yaxis_title="Risk Score (%)",
             yaxis_range=[0, 100],
             height=400,
@@ -459,7 +635,7 @@ class VisualizationUtils:
     def create_intervention_progress_chart(self, intervention_data):
         """Create a chart showing intervention progress"""
         if not intervention_data:
-            return go.Figure()
+            return _empty_figure()
         
         # Extract progress data
         interventions = list(intervention_data.keys())
@@ -493,21 +669,21 @@ class VisualizationUtils:
     def create_correlation_heatmap(self, health_data):
         """Create a correlation heatmap of health metrics"""
         if health_data.empty:
-            return go.Figure()
+            return _empty_figure()
         
         # Select numeric columns for correlation
         numeric_columns = health_data.select_dtypes(include=[np.number]).columns
-        correlation_data = health_data[numeric_columns].corr()
+        values = health_data[numeric_columns].to_numpy(dtype=float, na_value=np.nan)
+        correlation = _pairwise_corr(values)
         
         # Create heatmap
         fig = go.Figure(data=go.Heatmap(
-            z=correlation_data.values,
-            x=correlation_data.columns,
-            y=correlation_data.columns,
+            z=correlation,
+            x=numeric_columns,
+            y=numeric_columns,
             colorscale='RdBu',
             zmid=0,
-            text=correlation_data.round(2).values,
-            texttemplate="%{text}",
+            texttemplate="%{z:.2f}",
             textfont={"size": 10}
         ))
         
@@ -522,14 +698,14 @@ class VisualizationUtils:
     def create_health_score_breakdown(self, score_components):
         """Create a breakdown chart of health score components"""
         if not score_components:
-            return go.Figure()
+            return _empty_figure()
         
         # Create pie chart
         fig = go.Figure(data=[go.Pie(
             labels=list(score_components.keys()),
             values=list(score_components.values()),
             hole=0.3,
-            marker=dict(colors=px.colors.qualitative.Set3)
+            marker=dict(colors=self.color_schemes['series'])
         )])
         
         fig.update_layout(
@@ -543,7 +719,7 @@ class VisualizationUtils:
     def create_target_vs_actual_chart(self, targets, actuals):
         """Create a chart comparing targets vs actual values"""
         if not targets or not actuals:
-            return go.Figure()
+            return _empty_figure()
         
         metrics = list(targets.keys())
         target_values = list(targets.values())